@@ -0,0 +1,87 @@
+"""Micro-benchmark for SongHistory's in-memory window.
+
+Run from the repository root:  python -m benchmarks.history_bench
+Uses a no-op backend, so only the in-memory structure is measured.
+"""
+import time
+import random
+from collections import deque
+
+from src.core.history import SongHistory
+from src.core.history_store import HistoryBackend
+from src.core.song import SongRecord
+
+
+class NullBackend(HistoryBackend):
+    def load_recent(self, limit):
+        return []
+    
+    def max_id(self):
+        return 0
+    
+    def get(self, song_id):
+        return None
+    
+    def get_many(self, song_ids):
+        return []
+    
+    def ids_before(self, song_id):
+        return []
+    
+    def find_by_key(self, key):
+        return None
+    
+    def recent(self, limit):
+        return []
+    
+    def iter_songs(self, batch_size=1000):
+        return iter(())
+    
+    def count(self):
+        return 0
+    
+    def append(self, song):
+        pass
+    
+    def delete(self, song_id):
+        pass
+
+
+def _song(i: int) -> SongRecord:
+    return SongRecord(None, f"Song {i}", f"Artist {i % 500}", 'Album', '2024', 'Pop', i)
+
+
+def _per_op_us(func, count: int) -> float:
+    started = time.perf_counter()
+    func()
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def bench(size: int, removes: int = 1000) -> None:
+    history = SongHistory(limit=size, backend=NullBackend())
+    
+    fill_us = _per_op_us(lambda: [history.add(_song(i)) for i in range(size)], size)
+    # The window is full now, so every further add also evicts the oldest song
+    evict_us = _per_op_us(lambda: [history.add(_song(size + i)) for i in range(removes)], removes)
+    
+    ids = random.sample(list(history.songs_by_id), removes)
+    remove_us = _per_op_us(lambda: [history.remove(song_id) for song_id in ids], removes)
+    
+    # The previous implementation: rebuild the deque without the removed song
+    songs = deque(({'id': i, 'title': f"Song {i}"} for i in range(size)), maxlen=size)
+    old_ids = random.sample(range(size), min(removes, 100))
+    
+    def old_remove():
+        nonlocal songs
+        for song_id in old_ids:
+            songs = deque([s for s in songs if s['id'] != song_id], maxlen=songs.maxlen)
+    
+    old_remove_us = _per_op_us(old_remove, len(old_ids))
+    
+    print(f"{size:>7,} songs | add {fill_us:6.2f} us | add+evict {evict_us:6.2f} us | "
+          f"remove {remove_us:6.2f} us | old deque remove {old_remove_us:9.1f} us")
+
+
+if __name__ == "__main__":
+    for size in (10_000, 100_000):
+        bench(size)
@@ -0,0 +1,45 @@
+"""Frame time of the songs panel while an arrow key is held down.
+
+Run from the repository root:  python -m benchmarks.render_bench
+Every step moves the selection by one row and draws a full frame to an
+in-memory terminal, as Live does on each refresh.
+"""
+import io
+import time
+import statistics
+
+from rich.console import Console
+
+from src.core.history import SongHistory
+from src.core.song import SongRecord
+from src.ui.tui import ShazamTUI
+from benchmarks.history_bench import NullBackend
+
+
+def bench(size: int, width: int = 140, height: int = 50) -> None:
+    history = SongHistory(limit=size, backend=NullBackend())
+    for i in range(size):
+        history.add(SongRecord(None, f"Song number {i} (Extended Mix)", f"Artist {i % 300} feat. Somebody Else",
+                               'Album', '2024', 'Electronic, Dance', i))
+    
+    tui = ShazamTUI(history)
+    tui.console = Console(file=io.StringIO(), width=width, height=height, force_terminal=True, color_system="truecolor")
+    
+    frames = []
+    for _ in range(size - 1):
+        started = time.perf_counter()
+        tui.scroll_up()
+        tui.console.print(tui.render())
+        tui.mark_rendered()
+        frames.append((time.perf_counter() - started) * 1000)
+        tui.console.file.seek(0)
+        tui.console.file.truncate()
+    
+    frames.sort()
+    print(f"{size:,} songs, {width}x{height} | frame mean {statistics.mean(frames):.2f} ms"
+          f"  p50 {frames[len(frames) // 2]:.2f} ms  p95 {frames[int(len(frames) * 0.95)]:.2f} ms")
+
+
+if __name__ == "__main__":
+    bench(600)
+    bench(2000)
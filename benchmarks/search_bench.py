@@ -0,0 +1,57 @@
+"""Per-keystroke cost of the '/' filter over a large history.
+
+Run from the repository root:  python -m benchmarks.search_bench
+Titles, artists and albums are drawn from a Zipf-distributed vocabulary, so
+a few words are very common, as in real listening history.
+"""
+import time
+import asyncio
+import random
+import itertools
+
+from src.core.history import SongHistory
+from src.ui.tui import FILTER_MATCH_LIMIT
+from src.core.song import SongRecord
+from benchmarks.history_bench import NullBackend
+
+
+def _vocabulary(size: int) -> tuple:
+    words = [''.join(random.choice('aeioulnrstmkdbgchpy') for _ in range(random.randint(3, 9))) for _ in range(size)]
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(size)))
+    return words, weights
+
+
+def bench(size: int) -> None:
+    words, weights = _vocabulary(30_000)
+    
+    def phrase(count: int) -> str:
+        return ' '.join(w.capitalize() for w in random.choices(words, cum_weights=weights, k=count))
+    
+    history = SongHistory(limit=size, backend=NullBackend())
+    # The backend is empty, so this only creates the index that the adds below fill
+    asyncio.run(history.load_index())
+    started = time.perf_counter()
+    for _ in range(size):
+        history.add(SongRecord(None, phrase(random.randint(1, 4)), phrase(random.randint(1, 2)), phrase(2)))
+    add_us = (time.perf_counter() - started) / size * 1e6
+    print(f"{size:,} songs | add (with indexing) {add_us:.1f} us")
+    
+    # Type a rare, a mid-frequency and a very common word letter by letter, then
+    # multi-word queries: common + rare, two common words, and one that matches nothing
+    queries = (words[20_000], words[200], words[0], f"{words[0]} {words[20_000]}", f"{words[1]} {words[2]}",
+               f"{words[0]} {words[1]} zzzz")
+    slowest = 0.0
+    for text in queries:
+        for end in range(1, len(text) + 1):
+            query = text[:end]
+            started = time.perf_counter()
+            matches, more = history.search_newest(query, FILTER_MATCH_LIMIT)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            slowest = max(slowest, elapsed_ms)
+            print(f"  /{query:<20} {len(matches):>7,}{'+' if more else ' '} matches  {elapsed_ms:6.3f} ms")
+    print(f"slowest keystroke {slowest:.3f} ms")
+
+
+if __name__ == "__main__":
+    random.seed(1)
+    bench(100_000)
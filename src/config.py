@@ -3,10 +3,35 @@ from pathlib import Path
 CHUNK = 2048
 CHANNELS = 2
 RATE = 44100
+RECOGNITION_DOWNSAMPLE = True
+RECOGNITION_RATE = 16000
 RECORD_SECONDS = 10
+PROGRESSIVE_STEPS = [3, 6, 10]
+WINDOW_HOP_SECONDS = 10
+RING_BUFFER_SECONDS = 30
+PIPELINE_QUEUE_SIZE = 2
 HISTORY_LIMIT = 50
+DEDUP_POLICY = "normalized"
+HISTORY_BACKEND = "sqlite"
+JOURNAL_COMPACT_OPS = 1000
 AUTO_DOWNLOAD = False
 AUTO_PLAY_YOUTUBE = False
+DEBUG_WAV_FILES = False
+MUSIC_GATE = True
+MUSIC_GATE_MIN_RMS_DB = -50.0
+MUSIC_GATE_MIN_SCORE = 0.5
+SAME_SONG_THRESHOLD = 0.9
+SAME_SONG_MAX_SKIP_SECONDS = 240
+RECOGNITION_CACHE = True
+RECOGNITION_CACHE_SIZE = 500
+RECOGNITION_CACHE_TTL_HOURS = 72
+RECOGNITION_CACHE_THRESHOLD = 0.15
+SHAZAM_REQUESTS_PER_MINUTE = 20
+SHAZAM_BURST = 3
+CIRCUIT_BREAKER_FAILURES = 5
+CIRCUIT_BREAKER_RESET_SECONDS = 60
+BACKLOG_MAX_ENTRIES = 500
+BACKLOG_DRAIN_PER_MINUTE = 6
 HOME_DIR = Path.home()
 DOWNLOAD_DIR = HOME_DIR / "Music" / "ShazamLive"
 CACHE_DIR = HOME_DIR / ".cache" / "shazam_live"
@@ -21,18 +46,79 @@ def validate_config() -> bool:
     if not isinstance(RECORD_SECONDS, (int, float)) or RECORD_SECONDS < 1 or RECORD_SECONDS > 60:
         errors.append(f"RECORD_SECONDS must be between 1 and 60 seconds (got: {RECORD_SECONDS})")
     
+    if not isinstance(PROGRESSIVE_STEPS, (list, tuple)) or list(PROGRESSIVE_STEPS) != sorted(set(PROGRESSIVE_STEPS)) \
+            or any(step <= 0 or step > RECORD_SECONDS for step in PROGRESSIVE_STEPS):
+        errors.append(f"PROGRESSIVE_STEPS must be increasing durations up to RECORD_SECONDS (got: {PROGRESSIVE_STEPS})")
+    
+    if not isinstance(WINDOW_HOP_SECONDS, (int, float)) or WINDOW_HOP_SECONDS <= 0 or WINDOW_HOP_SECONDS > RECORD_SECONDS:
+        errors.append(f"WINDOW_HOP_SECONDS must be greater than 0 and at most RECORD_SECONDS (got: {WINDOW_HOP_SECONDS})")
+    
+    if not isinstance(RING_BUFFER_SECONDS, (int, float)) or RING_BUFFER_SECONDS < RECORD_SECONDS * 2:
+        errors.append(f"RING_BUFFER_SECONDS must be at least twice RECORD_SECONDS (got: {RING_BUFFER_SECONDS})")
+    
+    if not isinstance(PIPELINE_QUEUE_SIZE, int) or PIPELINE_QUEUE_SIZE < 1 or PIPELINE_QUEUE_SIZE > 10:
+        errors.append(f"PIPELINE_QUEUE_SIZE must be between 1 and 10 (got: {PIPELINE_QUEUE_SIZE})")
+    
     if CHANNELS not in [1, 2]:
         errors.append(f"CHANNELS must be 1 (mono) or 2 (stereo) (got: {CHANNELS})")
     
+    if not isinstance(MUSIC_GATE_MIN_SCORE, (int, float)) or not 0 <= MUSIC_GATE_MIN_SCORE <= 1:
+        errors.append(f"MUSIC_GATE_MIN_SCORE must be between 0 and 1 (got: {MUSIC_GATE_MIN_SCORE})")
+    
+    if not isinstance(SAME_SONG_THRESHOLD, (int, float)) or not 0 < SAME_SONG_THRESHOLD <= 1:
+        errors.append(f"SAME_SONG_THRESHOLD must be between 0 and 1 (got: {SAME_SONG_THRESHOLD})")
+    
+    if not isinstance(SAME_SONG_MAX_SKIP_SECONDS, (int, float)) or SAME_SONG_MAX_SKIP_SECONDS <= 0:
+        errors.append(f"SAME_SONG_MAX_SKIP_SECONDS must be greater than 0 (got: {SAME_SONG_MAX_SKIP_SECONDS})")
+    
+    if not isinstance(RECOGNITION_CACHE_SIZE, int) or RECOGNITION_CACHE_SIZE < 1:
+        errors.append(f"RECOGNITION_CACHE_SIZE must be at least 1 (got: {RECOGNITION_CACHE_SIZE})")
+    
+    if not isinstance(RECOGNITION_CACHE_TTL_HOURS, (int, float)) or RECOGNITION_CACHE_TTL_HOURS <= 0:
+        errors.append(f"RECOGNITION_CACHE_TTL_HOURS must be greater than 0 (got: {RECOGNITION_CACHE_TTL_HOURS})")
+    
+    if not isinstance(RECOGNITION_CACHE_THRESHOLD, (int, float)) or not 0 < RECOGNITION_CACHE_THRESHOLD <= 1:
+        errors.append(f"RECOGNITION_CACHE_THRESHOLD must be between 0 and 1 (got: {RECOGNITION_CACHE_THRESHOLD})")
+    
+    if not isinstance(SHAZAM_REQUESTS_PER_MINUTE, (int, float)) or SHAZAM_REQUESTS_PER_MINUTE <= 0:
+        errors.append(f"SHAZAM_REQUESTS_PER_MINUTE must be greater than 0 (got: {SHAZAM_REQUESTS_PER_MINUTE})")
+    
+    if not isinstance(SHAZAM_BURST, int) or SHAZAM_BURST < 1:
+        errors.append(f"SHAZAM_BURST must be at least 1 (got: {SHAZAM_BURST})")
+    
+    if not isinstance(CIRCUIT_BREAKER_FAILURES, int) or CIRCUIT_BREAKER_FAILURES < 1:
+        errors.append(f"CIRCUIT_BREAKER_FAILURES must be at least 1 (got: {CIRCUIT_BREAKER_FAILURES})")
+    
+    if not isinstance(CIRCUIT_BREAKER_RESET_SECONDS, (int, float)) or CIRCUIT_BREAKER_RESET_SECONDS <= 0:
+        errors.append(f"CIRCUIT_BREAKER_RESET_SECONDS must be greater than 0 (got: {CIRCUIT_BREAKER_RESET_SECONDS})")
+    
+    if not isinstance(BACKLOG_MAX_ENTRIES, int) or BACKLOG_MAX_ENTRIES < 1:
+        errors.append(f"BACKLOG_MAX_ENTRIES must be at least 1 (got: {BACKLOG_MAX_ENTRIES})")
+    
+    if not isinstance(BACKLOG_DRAIN_PER_MINUTE, (int, float)) or BACKLOG_DRAIN_PER_MINUTE <= 0:
+        errors.append(f"BACKLOG_DRAIN_PER_MINUTE must be greater than 0 (got: {BACKLOG_DRAIN_PER_MINUTE})")
+    
     valid_rates = [8000, 16000, 22050, 44100, 48000]
     if RATE not in valid_rates:
         errors.append(f"RATE should be one of {valid_rates} (got: {RATE})")
     
+    if RECOGNITION_RATE not in valid_rates or RECOGNITION_RATE > RATE:
+        errors.append(f"RECOGNITION_RATE should be one of {valid_rates} and not above RATE (got: {RECOGNITION_RATE})")
+    
     if not isinstance(CHUNK, int) or CHUNK < 256 or CHUNK > 8192:
         errors.append(f"CHUNK must be between 256 and 8192 (got: {CHUNK})")
     
-    if not isinstance(HISTORY_LIMIT, int) or HISTORY_LIMIT < 1 or HISTORY_LIMIT > 1000:
-        errors.append(f"HISTORY_LIMIT must be between 1 and 1000 (got: {HISTORY_LIMIT})")
+    if not isinstance(HISTORY_LIMIT, int) or HISTORY_LIMIT < 1:
+        errors.append(f"HISTORY_LIMIT must be at least 1 (got: {HISTORY_LIMIT})")
+    
+    if HISTORY_BACKEND not in ("sqlite", "journal", "json"):
+        errors.append(f"HISTORY_BACKEND must be 'sqlite', 'journal' or 'json' (got: {HISTORY_BACKEND})")
+    
+    if DEDUP_POLICY not in ("exact", "normalized", "loose"):
+        errors.append(f"DEDUP_POLICY must be 'exact', 'normalized' or 'loose' (got: {DEDUP_POLICY})")
+    
+    if not isinstance(JOURNAL_COMPACT_OPS, int) or JOURNAL_COMPACT_OPS < 10:
+        errors.append(f"JOURNAL_COMPACT_OPS must be at least 10 (got: {JOURNAL_COMPACT_OPS})")
     
     try:
         test_file = DOWNLOAD_DIR / ".test_write"
@@ -0,0 +1,259 @@
+import numpy as np
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple, Iterable, Union
+from .song import SongRecord
+
+
+PERIODS = ('hour', 'day', 'week')
+
+_NAT = np.iinfo(np.int64).min
+_DAY = 86400
+
+
+def _parse_times(values: List[str]) -> np.ndarray:
+    """ISO detected_at strings to int64 seconds; missing or unreadable ones become _NAT."""
+    try:
+        return np.array(values, dtype='datetime64[us]').astype('datetime64[s]').astype(np.int64)
+    except ValueError:
+        parsed = []
+        for value in values:
+            try:
+                parsed.append(np.datetime64(value, 'us'))
+            except ValueError:
+                parsed.append(np.datetime64('NaT'))
+        return np.array(parsed, dtype='datetime64[us]').astype('datetime64[s]').astype(np.int64)
+
+
+def _bucket(times: np.ndarray, period: str) -> np.ndarray:
+    days = times // _DAY
+    if period == 'hour':
+        return times // 3600
+    if period == 'week':
+        # Day 0 (1970-01-01) was a Thursday; shift so weeks start on Monday
+        return (days + 3) // 7
+    return days
+
+
+def _bucket_start(bucket: int, period: str) -> datetime:
+    if period == 'hour':
+        seconds = bucket * 3600
+    elif period == 'week':
+        seconds = (bucket * 7 - 3) * _DAY
+    else:
+        seconds = bucket * _DAY
+    return np.datetime64(int(seconds), 's').astype(datetime)
+
+
+def _group_counts(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct values and their counts, by sorting (np.unique hashes, which is slow on wide int keys)."""
+    if not len(values):
+        return values, values
+    values = np.sort(values)
+    starts = np.flatnonzero(np.diff(values, prepend=values[0] - 1))
+    return values[starts], np.diff(np.append(starts, len(values)))
+
+
+class _Labels:
+    """Dictionary encoding of a string column: each distinct value gets an int id."""
+    
+    __slots__ = ('ids', 'names')
+    
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+    
+    def encode(self, name: str) -> int:
+        label = self.ids.get(name)
+        if label is None:
+            label = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return label
+
+
+class HistoryAnalytics:
+    """Song history as NumPy columns, for vectorized group-by queries.
+    
+    Artists, genres and songs are dictionary-encoded into int32 columns, so a
+    group-by is a bincount or an np.unique over integers. detected_at is kept
+    as int64 seconds of local wall-clock time. Columns grow by doubling, so
+    appending a detection is amortized O(1); removals only clear a flag.
+    """
+    
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.times = np.zeros(capacity, dtype=np.int64)
+        self.artist_ids = np.zeros(capacity, dtype=np.int32)
+        self.genre_ids = np.zeros(capacity, dtype=np.int32)
+        self.song_ids = np.zeros(capacity, dtype=np.int32)
+        self.shazam_counts = np.zeros(capacity, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.artists = _Labels()
+        self.genres = _Labels()
+        self.songs = _Labels()
+    
+    @classmethod
+    def from_songs(cls, songs: Iterable[Union[SongRecord, Dict[str, Any]]]) -> 'HistoryAnalytics':
+        """Build the columns in one pass over (oldest first) songs, e.g. SongHistory.iter_songs()."""
+        analytics = cls()
+        ids, times, artists, genres, keys, counts = [], [], [], [], [], []
+        encode_artist, encode_genre, encode_song = analytics.artists.encode, analytics.genres.encode, analytics.songs.encode
+        
+        for song in songs:
+            if isinstance(song, SongRecord):
+                song = song.to_dict()
+            artist = song.get('artist') or 'Unknown'
+            ids.append(song.get('id') or 0)
+            times.append(song.get('detected_at') or '')
+            artists.append(encode_artist(artist))
+            genres.append(encode_genre(song.get('genres') or 'Unknown'))
+            keys.append(encode_song(f"{song.get('title') or ''}|{artist}"))
+            counts.append(song.get('shazam_count') or 0)
+        
+        analytics._grow(len(ids))
+        size = analytics.size = len(ids)
+        analytics.ids[:size] = ids
+        analytics.times[:size] = _parse_times(times) if times else []
+        analytics.artist_ids[:size] = artists
+        analytics.genre_ids[:size] = genres
+        analytics.song_ids[:size] = keys
+        analytics.shazam_counts[:size] = counts
+        analytics.alive[:size] = True
+        return analytics
+    
+    def _grow(self, needed: int) -> None:
+        capacity = len(self.ids)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ('ids', 'times', 'artist_ids', 'genre_ids', 'song_ids', 'shazam_counts', 'alive'):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+    
+    def append(self, song: SongRecord) -> None:
+        self._grow(self.size + 1)
+        i = self.size
+        self.ids[i] = song.id or 0
+        self.times[i] = _parse_times([song.detected_at])[0]
+        self.artist_ids[i] = self.artists.encode(song.artist)
+        self.genre_ids[i] = self.genres.encode(song.genres)
+        self.song_ids[i] = self.songs.encode(f"{song.title}|{song.artist}")
+        self.shazam_counts[i] = song.shazam_count
+        self.alive[i] = True
+        self.size += 1
+    
+    def remove(self, song_id: int) -> None:
+        # Ids are appended in increasing order, so the column is sorted
+        i = int(np.searchsorted(self.ids[:self.size], song_id))
+        if i < self.size and self.ids[i] == song_id:
+            self.alive[i] = False
+    
+    def _rows(self, since: Optional[datetime] = None) -> np.ndarray:
+        """Indices of the live rows with a known time, optionally from `since` on."""
+        n = self.size
+        mask = self.alive[:n] & (self.times[:n] != _NAT)
+        if since is not None:
+            mask &= self.times[:n] >= np.datetime64(since, 's').astype(np.int64)
+        return np.flatnonzero(mask)
+    
+    def _bucketed(self, period: str, since: Optional[datetime], last: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and their bucket numbers, cut down to the `last` buckets before any per-bucket Python work."""
+        rows = self._rows(since)
+        buckets = _bucket(self.times[rows], period)
+        if last is not None and len(rows):
+            # Not a slice: songs from the offline backlog get later ids than songs heard after them
+            distinct, _ = _group_counts(buckets)
+            if len(distinct) > last:
+                recent = buckets >= distinct[-last]
+                rows, buckets = rows[recent], buckets[recent]
+        return rows, buckets
+    
+    def _labels(self, kind: str) -> Tuple[np.ndarray, _Labels]:
+        if kind == 'artist':
+            return self.artist_ids, self.artists
+        if kind == 'genre':
+            return self.genre_ids, self.genres
+        raise ValueError(f"Unknown kind: {kind}")
+    
+    def summary(self, since: Optional[datetime] = None) -> Dict[str, Any]:
+        rows = self._rows(since)
+        if not len(rows):
+            return {'detections': 0, 'artists': 0, 'genres': 0, 'songs': 0, 'avg_shazam_count': 0,
+                    'repeat_rate': 0.0, 'first': None, 'last': None}
+        
+        # Label ids are small and dense, so counting distinct values is a bincount
+        songs = np.count_nonzero(np.bincount(self.song_ids[rows]))
+        times = self.times[rows]
+        return {
+            'detections': len(rows),
+            'artists': np.count_nonzero(np.bincount(self.artist_ids[rows])),
+            'genres': np.count_nonzero(np.bincount(self.genre_ids[rows])),
+            'songs': songs,
+            'avg_shazam_count': int(self.shazam_counts[rows].mean()),
+            'repeat_rate': 1 - songs / len(rows),
+            'first': np.datetime64(int(times.min()), 's').astype(datetime),
+            'last': np.datetime64(int(times.max()), 's').astype(datetime)
+        }
+    
+    def detections(self, period: str = 'day', since: Optional[datetime] = None,
+                   last: Optional[int] = None) -> List[Tuple[datetime, int]]:
+        """Detections per hour/day/week bucket that has any, optionally only the `last` such buckets."""
+        _, buckets = self._bucketed(period, since, last)
+        buckets, counts = _group_counts(buckets)
+        return [(_bucket_start(b, period), int(c)) for b, c in zip(buckets, counts)]
+    
+    def top(self, kind: str = 'artist', n: int = 5, since: Optional[datetime] = None) -> List[Tuple[str, int]]:
+        """Most detected artists or genres; "Unknown" is left out."""
+        column, labels = self._labels(kind)
+        counts = np.bincount(column[self._rows(since)], minlength=len(labels.names))
+        unknown = labels.ids.get('Unknown')
+        if unknown is not None:
+            counts[unknown] = 0
+        order = np.argsort(-counts, kind='stable')[:n]
+        return [(labels.names[i], int(counts[i])) for i in order if counts[i] > 0]
+    
+    def top_per_bucket(self, kind: str = 'artist', period: str = 'day', n: int = 3, since: Optional[datetime] = None,
+                       last: Optional[int] = None) -> List[Tuple[datetime, List[Tuple[str, int]]]]:
+        """For every bucket (or the `last` ones), its n most detected artists or genres."""
+        column, labels = self._labels(kind)
+        rows, buckets = self._bucketed(period, since, last)
+        unknown = labels.ids.get('Unknown')
+        if unknown is not None:
+            known = column[rows] != unknown
+            rows, buckets = rows[known], buckets[known]
+        if not len(rows):
+            return []
+        
+        # Group by (bucket, label) through one combined integer key
+        first = buckets.min()
+        width = len(labels.names)
+        pairs, counts = _group_counts((buckets - first) * width + column[rows])
+        pair_buckets, pair_labels = pairs // width + first, pairs % width
+        
+        # Within each bucket, highest count first
+        order = np.lexsort((-counts, pair_buckets))
+        sorted_buckets = pair_buckets[order]
+        starts = np.flatnonzero(np.diff(sorted_buckets, prepend=sorted_buckets[0] - 1))
+        result = []
+        for start, end in zip(starts, np.append(starts[1:], len(order))):
+            picked = order[start:min(start + n, end)]
+            result.append((_bucket_start(sorted_buckets[start], period),
+                           [(labels.names[pair_labels[i]], int(counts[i])) for i in picked]))
+        return result
+    
+    def repeat_rates(self, period: str = 'day', since: Optional[datetime] = None,
+                     last: Optional[int] = None) -> List[Tuple[datetime, float]]:
+        """Share of each bucket's detections that repeat a song already heard in that bucket."""
+        rows, buckets = self._bucketed(period, since, last)
+        if not len(rows):
+            return []
+        
+        first = buckets.min()
+        width = len(self.songs.names)
+        distinct_pairs, _ = _group_counts((buckets - first) * width + self.song_ids[rows])
+        unique_buckets, totals = _group_counts(buckets)
+        distinct = np.bincount(distinct_pairs // width)
+        return [(_bucket_start(b, period), float(1 - distinct[b - first] / total)) for b, total in zip(unique_buckets, totals)]
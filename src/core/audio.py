@@ -1,18 +1,24 @@
 import asyncio
+import functools
+import math
+import time
 import wave
 import tempfile
+import threading
 import numpy as np
 import pyaudio
-from typing import Optional
-from ..config import CHUNK, CHANNELS, RATE
+from typing import Optional, Dict, Tuple
+from ..config import (
+    CHUNK, CHANNELS, RATE, RING_BUFFER_SECONDS, MUSIC_GATE_MIN_RMS_DB, MUSIC_GATE_MIN_SCORE,
+    SAME_SONG_THRESHOLD, SAME_SONG_MAX_SKIP_SECONDS, WINDOW_HOP_SECONDS, RECOGNITION_RATE
+)
 from ..utils.logger import log
 from ..utils.executor import executor_manager
+from ..utils.metrics import metrics
 
 
-def normalize_audio_data(frames: list) -> bytes:
+def normalize_audio_data(audio_data: np.ndarray) -> bytes:
     try:
-        frame_arrays = [np.frombuffer(frame, dtype=np.int16) for frame in frames]
-        audio_data = np.concatenate(frame_arrays)
         rms = np.sqrt(np.mean(audio_data.astype(np.float32)**2))
         
         if rms > 0:
@@ -24,113 +30,447 @@ def normalize_audio_data(frames: list) -> bytes:
         return audio_data.astype(np.int16).tobytes()
     except Exception as e:
         log(f"Warning: Audio normalization optimization failed, using fallback: {e}", "WARNING")
-        return b''.join(frames)
+        return audio_data.astype(np.int16).tobytes()
 
 
-async def record_audio(duration: int, stop_event: Optional[asyncio.Event] = None, show_progress: bool = True) -> Optional[str]:
-    temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-    temp_path = temp_file.name
-    temp_file.close()
+def to_mono(samples: np.ndarray, channels: int) -> np.ndarray:
+    """Interleaved int16 samples to float32 mono in [-1, 1)."""
+    audio = samples.astype(np.float32) / 32768.0
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio
+
+
+@functools.lru_cache(maxsize=4)
+def _polyphase_bank(up: int, down: int, taps_per_phase: int = 48) -> np.ndarray:
+    """Kaiser-windowed sinc low-pass split into `up` phases of `taps_per_phase` taps each."""
+    length = taps_per_phase * up
+    cutoff = 1.0 / max(up, down)
+    t = np.arange(length) - (length - 1) / 2
+    h = np.sinc(t * cutoff) * np.kaiser(length, 5.0) * cutoff * up
+    return h.reshape(taps_per_phase, up).T.astype(np.float32)
+
+
+def resample_poly(audio: np.ndarray, rate_in: int, rate_out: int, block: int = 16384) -> np.ndarray:
+    """Polyphase rational resampling of float32 mono audio.
     
-    # Create a threading.Event if an asyncio.Event is passed, to share with the thread
-    # Actually, executor runs in a thread, so we need a threading.Event-like object that is thread-safe.
-    # We can pass an object that has an is_set() method.
-    # But to be safe, let's assume the caller passes an object with is_set(). 
-    # Wait, asyncio.Event is not thread-safe for reading from another thread? 
-    # Actually, asyncio.Event is not thread-safe. We should pass a threading.Event or a simplified wrapper.
-    # Let's verify what we can pass. Ideally, we pass a threading.Event.
-    # So the signature: stop_event: Optional[threading.Event]
+    Only the filter phase each output sample actually needs is evaluated, so
+    44.1 kHz -> 16 kHz costs 48 multiply-adds per output sample instead of
+    filtering the 160x upsampled signal.
+    """
+    if rate_in == rate_out:
+        return audio
     
-    try:
-        return await executor_manager.run_in_executor(_record_audio_sync, duration, temp_path, show_progress, stop_event)
-        
-    except Exception as e:
-        log(f"Recording failed: {e}", "ERROR")
+    g = math.gcd(rate_in, rate_out)
+    up, down = rate_out // g, rate_in // g
+    bank = _polyphase_bank(up, down)
+    taps = bank.shape[1]
+    
+    # Zero-pad so every tap has input, then shift by the filter's group delay
+    padded = np.concatenate((np.zeros(taps, dtype=np.float32), audio.astype(np.float32), np.zeros(taps, dtype=np.float32)))
+    delay = (taps * up - 1) // 2
+    n_out = len(audio) * up // down
+    out = np.empty(n_out, dtype=np.float32)
+    
+    # Blocked so the gathered (outputs x taps) matrices stay small
+    for start in range(0, n_out, block):
+        position = np.arange(start, min(start + block, n_out), dtype=np.int64) * down + delay
+        base = position // up + taps
+        phase = position % up
+        gathered = padded[base[:, None] - np.arange(taps)[None, :]]
+        out[start:start + len(position)] = np.einsum('ij,ij->i', gathered, bank[phase])
+    
+    return out
+
+
+def to_recognition_format(samples: np.ndarray, channels: int, rate: int) -> Tuple[np.ndarray, int, int]:
+    """Downmix to mono and resample to RECOGNITION_RATE, the format Shazam fingerprints use anyway.
+    
+    Returns (int16 samples, channels, rate). Sizes and CPU time before/after are
+    recorded so the compact path can be compared with the full-rate one.
+    """
+    started = time.thread_time()
+    
+    mono = to_mono(samples, channels)
+    compact = resample_poly(mono, rate, RECOGNITION_RATE)
+    compact = np.clip(compact * 32768.0, -32768, 32767).astype(np.int16)
+    
+    metrics.record('window_bytes_raw', samples.nbytes)
+    metrics.record('window_bytes_compact', compact.nbytes)
+    metrics.record('downsample_cpu_ms', (time.thread_time() - started) * 1000)
+    return compact, 1, RECOGNITION_RATE
+
+
+def _spectrogram(mono: np.ndarray, frame_size: int = 2048, hop: int = 1024) -> Tuple[np.ndarray, np.ndarray]:
+    """Windowed frames and their magnitude spectra, computed in a single vectorized pass."""
+    frames = np.lib.stride_tricks.sliding_window_view(mono, frame_size)[::hop] * np.hanning(frame_size).astype(np.float32)
+    return frames, np.abs(np.fft.rfft(frames, axis=1))
+
+
+def _music_features(mono: np.ndarray, frames: Optional[np.ndarray], magnitude: Optional[np.ndarray], rate: int) -> Dict[str, float]:
+    frame_size = 2048
+    hop = 1024
+    eps = 1e-10
+    
+    rms = float(np.sqrt(np.mean(mono ** 2))) if len(mono) else 0.0
+    features = {
+        'rms_db': float(20 * np.log10(rms + eps)),
+        'flatness': 1.0,
+        'tonality': 0.0,
+        'beat': 0.0,
+        'low_energy': 1.0,
+    }
+    
+    if magnitude is None:
+        return features
+    
+    # Flatness over the musically relevant band only; hiss above 8 kHz would swamp it
+    low_bin = int(100 * frame_size / rate)
+    high_bin = int(8000 * frame_size / rate)
+    power = magnitude[:, low_bin:high_bin] ** 2 + eps
+    flatness = np.exp(np.log(power).mean(axis=1)) / power.mean(axis=1)
+    features['flatness'] = float(np.median(flatness))
+    features['tonality'] = 1.0 - features['flatness']
+    
+    # Speech is full of short pauses, music mostly is not
+    frame_rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    features['low_energy'] = float(np.mean(frame_rms < 0.5 * frame_rms.mean()))
+    
+    # Positive spectral flux is the onset envelope; periodicity in it means a steady beat
+    compressed = np.log1p(100 * magnitude)
+    flux = np.maximum(np.diff(compressed, axis=0), 0).sum(axis=1)
+    flux -= flux.mean()
+    energy = float(np.dot(flux, flux))
+    
+    frames_per_second = rate / hop
+    min_lag = int(frames_per_second * 60 / 180)
+    max_lag = min(int(frames_per_second * 60 / 60), len(flux) - 1)
+    
+    if energy > 0 and max_lag > min_lag:
+        autocorr = np.correlate(flux, flux, mode='full')[len(flux) - 1:]
+        features['beat'] = float(max(autocorr[min_lag:max_lag + 1].max() / energy, 0.0))
+    
+    return features
+
+
+@functools.lru_cache(maxsize=4)
+def _fingerprint_matrix(rate: int, frame_size: int = 2048) -> np.ndarray:
+    """Maps FFT bins to 12 chroma classes followed by 16 log-spaced energy bands."""
+    freqs = np.fft.rfftfreq(frame_size, 1.0 / rate)
+    matrix = np.zeros((28, len(freqs)), dtype=np.float32)
+    
+    audible = (freqs >= 55) & (freqs <= 5000)
+    pitch_class = np.round(12 * np.log2(freqs[audible] / 440.0)).astype(int) % 12
+    matrix[pitch_class, np.nonzero(audible)[0]] = 1.0
+    
+    edges = np.geomspace(60, min(12000, rate / 2), 17)
+    for band in range(16):
+        matrix[12 + band] = (freqs >= edges[band]) & (freqs < edges[band + 1])
+    
+    return matrix
+
+
+def _fingerprint(magnitude: Optional[np.ndarray], rate: int) -> Optional[np.ndarray]:
+    if magnitude is None:
         return None
+    
+    profile = np.log1p(_fingerprint_matrix(rate) @ magnitude.mean(axis=0))
+    chroma, envelope = profile[:12], profile[12:]
+    
+    # Centering and scaling each half makes the comparison about shape (harmony, timbre)
+    # rather than loudness, and keeps the wide-range envelope from drowning out the chroma
+    chroma = chroma - chroma.mean()
+    envelope = envelope - envelope.mean()
+    chroma /= np.linalg.norm(chroma) + 1e-10
+    envelope /= np.linalg.norm(envelope) + 1e-10
+    return np.concatenate((chroma, envelope))
 
 
-def _record_audio_sync(duration: int, temp_path: str, show_progress: bool, stop_event=None) -> Optional[str]:
-    audio = None
-    stream = None
-    wf = None
+def analyze_music_presence(samples: np.ndarray, channels: int, rate: int = RATE) -> Dict[str, float]:
+    """Cheap per-window features used to decide whether a window is worth a lookup.
     
-    try:
-        audio = pyaudio.PyAudio()
-        
-        try:
-            stream = audio.open(
-                format=pyaudio.paInt16,
-                channels=CHANNELS,
-                rate=RATE,
-                input=True,
-                frames_per_buffer=CHUNK
-            )
-            channels_used = CHANNELS
-        except Exception:
-            stream = audio.open(
-                format=pyaudio.paInt16,
-                channels=1,
-                rate=RATE,
-                input=True,
-                frames_per_buffer=CHUNK
-            )
-            channels_used = 1
+    - rms_db: overall loudness in dBFS
+    - flatness: median spectral flatness (1.0 = white noise, ~0 = pure tones)
+    - tonality: 1 - flatness
+    - beat: strongest onset-envelope autocorrelation in the 60-180 BPM range
+    - low_energy: share of frames quieter than half the mean frame level (high for speech)
+    """
+    return analyze_window(samples, channels, rate)[0]
+
+
+def spectral_fingerprint(samples: np.ndarray, channels: int, rate: int = RATE) -> Optional[np.ndarray]:
+    """28-value chroma + spectral-envelope summary of a window, for cheap same-song checks."""
+    return analyze_window(samples, channels, rate)[1]
+
+
+def analyze_window(samples: np.ndarray, channels: int, rate: int = RATE) -> Tuple[Dict[str, float], Optional[np.ndarray]]:
+    """Music-presence features and fingerprint of a window from one shared spectrogram."""
+    mono = to_mono(samples, channels)
+    
+    if len(mono) < 2048 * 4:
+        return _music_features(mono, None, None, rate), None
+    
+    frames, magnitude = _spectrogram(mono)
+    return _music_features(mono, frames, magnitude, rate), _fingerprint(magnitude, rate)
+
+
+def fingerprint_similarity(a: Optional[np.ndarray], b: Optional[np.ndarray]) -> float:
+    """Cosine similarity of two fingerprints, 0.0 when either is missing or flat."""
+    if a is None or b is None:
+        return 0.0
+    
+    norm = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(np.dot(a, b) / norm) if norm > 0 else 0.0
+
+
+def is_music(features: Dict[str, float]) -> bool:
+    """True unless the window is clearly silence, noise or beatless atonal sound (e.g. chatter)."""
+    if features['rms_db'] < MUSIC_GATE_MIN_RMS_DB:
+        return False
+    
+    score = 0.4 * features['tonality'] + 0.4 * features['beat'] + 0.2 * (1.0 - features['low_energy'])
+    return score >= MUSIC_GATE_MIN_SCORE
+
+
+class SongChangeDetector:
+    """Keeps a "still playing" lock on the last identified song.
+    
+    While consecutive windows stay similar to the window that was matched, the
+    loop can skip network lookups; a large change in the audio releases the lock.
+    The lock is re-verified after max_skip_seconds of audio, counted in windows
+    of hop_seconds each.
+    """
+    
+    def __init__(self, threshold: float = SAME_SONG_THRESHOLD, max_skip_seconds: float = SAME_SONG_MAX_SKIP_SECONDS,
+                 hop_seconds: float = WINDOW_HOP_SECONDS):
+        self.threshold = threshold
+        self.max_skip_seconds = max_skip_seconds
+        self.max_skips = 1
+        self.song_id: Optional[int] = None
+        self._reference: Optional[np.ndarray] = None
+        self._skips = 0
+        self.set_hop(hop_seconds)
+    
+    def set_hop(self, hop_seconds: float) -> None:
+        """Windows are hop_seconds of audio apart; convert the skip limit to a window count."""
+        self.max_skips = max(1, round(self.max_skip_seconds / hop_seconds))
+    
+    def lock(self, song_id: Optional[int], fingerprint: Optional[np.ndarray]) -> None:
+        self.song_id = song_id
+        self._reference = fingerprint
+        self._skips = 0
+    
+    def reset(self) -> None:
+        self.lock(None, None)
+    
+    def is_same_song(self, fingerprint: Optional[np.ndarray]) -> bool:
+        if self.song_id is None or self._reference is None:
+            return False
         
-        frames = []
-        total_chunks = int(RATE / CHUNK * duration)
-        chunks_per_second = RATE // CHUNK
+        # Re-verify with a real lookup every so often, in case of a seamless transition
+        if self._skips >= self.max_skips:
+            self.reset()
+            return False
         
-        for i in range(total_chunks):
-            if stop_event and stop_event.is_set():
-                break
-                
-            if show_progress and i % (chunks_per_second // 2) == 0:
-                elapsed = i // chunks_per_second
-                dots = "." * ((elapsed % 4) + 1)
-                print(f"\r🎧 Listening{dots:<4}", end="", flush=True)
-            
-            data = stream.read(CHUNK, exception_on_overflow=False)
-            frames.append(data)
+        if fingerprint_similarity(self._reference, fingerprint) < self.threshold:
+            self.reset()
+            return False
         
-        stream.stop_stream()
-        stream.close()
-        stream = None
+        # Follow slow drift (verse -> chorus) without losing the lock
+        self._reference = 0.7 * self._reference + 0.3 * fingerprint
+        self._skips += 1
+        return True
+
+
+class RingBuffer:
+    """Fixed-size int16 sample store addressed by absolute frame position."""
+    
+    def __init__(self, capacity_frames: int, channels: int):
+        self.capacity = capacity_frames
+        self.channels = channels
+        self.frames_written = 0
+        self._data = np.zeros(capacity_frames * channels, dtype=np.int16)
+        self._lock = threading.Lock()
+    
+    def write(self, data: bytes) -> None:
+        samples = np.frombuffer(data, dtype=np.int16)
+        frames = len(samples) // self.channels
         
-        normalized_data = normalize_audio_data(frames)
+        with self._lock:
+            # Only the newest `capacity` frames can survive a single write
+            if frames > self.capacity:
+                samples = samples[-self.capacity * self.channels:]
+                skipped = frames - self.capacity
+            else:
+                skipped = 0
+            
+            start = ((self.frames_written + skipped) % self.capacity) * self.channels
+            end = start + len(samples)
+            
+            if end <= len(self._data):
+                self._data[start:end] = samples
+            else:
+                split = len(self._data) - start
+                self._data[start:] = samples[:split]
+                self._data[:end - len(self._data)] = samples[split:]
+            
+            self.frames_written += frames
+    
+    def read(self, start_frame: int, end_frame: int) -> Optional[np.ndarray]:
+        """Copy out frames [start_frame, end_frame), or None if not (or no longer) buffered."""
+        with self._lock:
+            if end_frame > self.frames_written or start_frame < self.frames_written - self.capacity:
+                return None
+            
+            start = (start_frame % self.capacity) * self.channels
+            length = (end_frame - start_frame) * self.channels
+            end = start + length
+            
+            if end <= len(self._data):
+                return self._data[start:end].copy()
+            
+            return np.concatenate((self._data[start:], self._data[:end - len(self._data)]))
+
+
+class AudioCapture:
+    """Long-lived input stream that continuously fills a ring buffer.
+    
+    The device is opened once and PortAudio delivers chunks through a callback,
+    so consumers can slice back-to-back or overlapping windows out of the buffer
+    without ever reopening the stream.
+    """
+    
+    STALL_TIMEOUT = 2.0
+    
+    def __init__(self, buffer_seconds: float = RING_BUFFER_SECONDS):
+        self.buffer_seconds = buffer_seconds
+        self.rate = RATE
+        self.channels = CHANNELS
+        self.buffer: Optional[RingBuffer] = None
+        self.overflows = 0
+        self._audio = None
+        self._stream = None
+    
+    @property
+    def frames_written(self) -> int:
+        return self.buffer.frames_written if self.buffer else 0
+    
+    def is_active(self) -> bool:
+        try:
+            return self._stream is not None and self._stream.is_active()
+        except Exception:
+            return False
+    
+    async def start(self) -> bool:
+        try:
+            return await executor_manager.run_in_executor(self._start_sync)
+        except Exception as e:
+            log(f"Audio capture failed to start: {e}", "ERROR")
+            return False
+    
+    def _start_sync(self) -> bool:
+        try:
+            self._audio = pyaudio.PyAudio()
+            
+            for channels in (CHANNELS, 1):
+                try:
+                    self.buffer = RingBuffer(int(self.rate * self.buffer_seconds), channels)
+                    self._stream = self._audio.open(
+                        format=pyaudio.paInt16,
+                        channels=channels,
+                        rate=self.rate,
+                        input=True,
+                        frames_per_buffer=CHUNK,
+                        stream_callback=self._on_audio
+                    )
+                    self.channels = channels
+                    break
+                except Exception:
+                    if channels == 1:
+                        raise
+            
+            self._stream.start_stream()
+            return True
         
-        wf = wave.open(temp_path, 'wb')
-        wf.setnchannels(channels_used)
-        wf.setsampwidth(audio.get_sample_size(pyaudio.paInt16))
-        wf.setframerate(RATE)
-        wf.writeframes(normalized_data)
-        wf.close()
-        wf = None
+        except Exception as e:
+            log(f"Audio capture failed to start: {e}", "ERROR")
+            self.stop()
+            return False
+    
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        if status & pyaudio.paInputOverflow:
+            self.overflows += 1
+        self.buffer.write(in_data)
+        return (None, pyaudio.paContinue)
+    
+    async def read_window(self, start_frame: int, end_frame: int) -> Optional[np.ndarray]:
+        """Wait until frames [start_frame, end_frame) are captured and return them."""
+        last_written = self.frames_written
+        stalled_for = 0.0
         
-        return temp_path
+        while self.frames_written < end_frame:
+            if not self.is_active():
+                return None
+            
+            # Sleep for exactly as long as the missing audio takes to arrive
+            delay = max((end_frame - self.frames_written) / self.rate, 0.01)
+            await asyncio.sleep(delay)
+            
+            if self.frames_written == last_written:
+                stalled_for += delay
+                if stalled_for >= self.STALL_TIMEOUT:
+                    log("Audio capture stalled", "ERROR")
+                    return None
+            else:
+                last_written = self.frames_written
+                stalled_for = 0.0
         
-    except Exception as e:
-        log(f"Recording failed: {e}", "ERROR")
-        return None
+        return self.buffer.read(start_frame, end_frame)
     
-    finally:
-        if stream is not None:
+    def stop(self) -> None:
+        if self._stream is not None:
             try:
-                stream.stop_stream()
-                stream.close()
+                self._stream.stop_stream()
+                self._stream.close()
             except Exception:
                 pass
+            self._stream = None
         
-        if audio is not None:
+        if self._audio is not None:
             try:
-                audio.terminate()
+                self._audio.terminate()
             except Exception:
                 pass
+            self._audio = None
+
+
+async def save_window(samples: np.ndarray, channels: int, rate: int = RATE) -> Optional[str]:
+    try:
+        return await executor_manager.run_in_executor(_save_window_sync, samples, channels, rate)
+    except Exception as e:
+        log(f"Saving audio window failed: {e}", "ERROR")
+        return None
+
+
+def _save_window_sync(samples: np.ndarray, channels: int, rate: int) -> Optional[str]:
+    temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+    temp_path = temp_file.name
+    temp_file.close()
+    
+    try:
+        normalized_data = normalize_audio_data(samples)
         
-        if wf is not None:
-            try:
-                wf.close()
-            except Exception:
-                pass
+        with wave.open(temp_path, 'wb') as wf:
+            wf.setnchannels(channels)
+            wf.setsampwidth(2)
+            wf.setframerate(rate)
+            wf.writeframes(normalized_data)
+        
+        return temp_path
+    
+    except Exception as e:
+        log(f"Saving audio window failed: {e}", "ERROR")
+        return None
 
 
 async def test_microphone() -> bool:
@@ -147,7 +487,7 @@ async def test_microphone() -> bool:
             frames_per_buffer=CHUNK
         )
         return True
-        
+    
     except Exception as e:
         log(f"Microphone test failed: {e}", "ERROR")
         return False
@@ -0,0 +1,97 @@
+import os
+import json
+import asyncio
+import threading
+from collections import deque
+from typing import Optional, Dict, Any
+from ..config import CACHE_DIR, BACKLOG_MAX_ENTRIES
+from ..utils.logger import log
+from ..utils.executor import executor_manager
+from ..utils.metrics import metrics
+
+
+class RecognitionBacklog:
+    """Bounded on-disk queue of signatures that could not be sent to Shazam.
+    
+    Entries hold the compact signature fields plus the time the audio was heard,
+    so a match found after an outage keeps its original detected_at. When full,
+    the oldest entry is dropped. Every change rewrites the JSONL file atomically
+    in the executor; changes are rare (at most one per window).
+    """
+    
+    def __init__(self, max_entries: int = BACKLOG_MAX_ENTRIES):
+        self.cache_file = CACHE_DIR / "recognition_backlog.jsonl"
+        self.entries: deque = deque(maxlen=max_entries)
+        self._version = 0
+        self._written_version = 0
+        self._file_lock = threading.Lock()
+        self._save_task: Optional[asyncio.Task] = None
+        self._load()
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def add(self, uri: str, samples: int, timestamp: int, detected_at: str) -> None:
+        if len(self.entries) == self.entries.maxlen:
+            metrics.increment('backlog_dropped')
+        
+        self.entries.append({
+            'uri': uri,
+            'samples': samples,
+            'timestamp': timestamp,
+            'detected_at': detected_at
+        })
+        metrics.increment('backlog_added')
+        self._schedule_save()
+    
+    def peek(self) -> Optional[Dict[str, Any]]:
+        return self.entries[0] if self.entries else None
+    
+    def pop(self) -> None:
+        if self.entries:
+            self.entries.popleft()
+            self._schedule_save()
+    
+    def _schedule_save(self) -> None:
+        self._version += 1
+        lines = [json.dumps(entry) for entry in self.entries]
+        self._save_task = asyncio.create_task(
+            executor_manager.run_in_executor(self._write_sync, self._version, lines)
+        )
+    
+    def _write_sync(self, version: int, lines: list) -> None:
+        # Writes may finish out of order; never let an older snapshot replace a newer one
+        with self._file_lock:
+            if version <= self._written_version:
+                return
+            
+            try:
+                tmp_file = self.cache_file.with_suffix('.tmp')
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    f.write(''.join(line + '\n' for line in lines))
+                os.replace(tmp_file, self.cache_file)
+                self._written_version = version
+            except Exception as e:
+                log(f"Warning: Could not save recognition backlog: {e}", "WARNING")
+    
+    def _load(self) -> None:
+        if not self.cache_file.exists():
+            return
+        
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        self.entries.append(json.loads(line))
+        except Exception as e:
+            log(f"Warning: Could not load recognition backlog: {e}", "WARNING")
+    
+    async def cleanup(self):
+        if self._save_task and not self._save_task.done():
+            try:
+                await self._save_task
+            except Exception:
+                pass
+        
+        if self._written_version < self._version:
+            self._write_sync(self._version, [json.dumps(entry) for entry in self.entries])
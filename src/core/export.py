@@ -0,0 +1,112 @@
+import csv
+import json
+from datetime import datetime
+from itertools import islice
+from typing import Optional, Dict, Any, List, Iterable, Iterator, IO
+from .song import RECORD_FIELDS
+from ..utils.text import normalize_text
+
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'parquet')
+
+
+class ExportError(Exception):
+    pass
+
+
+def filter_songs(songs: Iterable[Dict[str, Any]], since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 artist: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Songs detected in [since, until) whose artist contains `artist` (ignoring case and accents).
+    
+    detected_at is an ISO string, so the date range is a plain string comparison.
+    """
+    start = since.isoformat() if since else None
+    end = until.isoformat() if until else None
+    needle = normalize_text(artist) if artist else None
+    
+    for song in songs:
+        detected_at = song.get('detected_at') or ''
+        if start and detected_at < start:
+            continue
+        if end and detected_at >= end:
+            continue
+        if needle and needle not in normalize_text(song.get('artist') or ''):
+            continue
+        yield song
+
+
+def chunked(songs: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    songs = iter(songs)
+    while True:
+        chunk = list(islice(songs, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _write_csv(chunks: Iterator[List[Dict[str, Any]]], out: IO[str]) -> int:
+    writer = csv.DictWriter(out, fieldnames=RECORD_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    written = 0
+    for chunk in chunks:
+        writer.writerows(chunk)
+        written += len(chunk)
+    return written
+
+
+def _write_jsonl(chunks: Iterator[List[Dict[str, Any]]], out: IO[str]) -> int:
+    written = 0
+    for chunk in chunks:
+        out.write(''.join(
+            json.dumps({field: song.get(field) for field in RECORD_FIELDS}, ensure_ascii=False) + '\n' for song in chunk
+        ))
+        written += len(chunk)
+    return written
+
+
+def _write_parquet(chunks: Iterator[List[Dict[str, Any]]], path: str) -> int:
+    # Imported here rather than at module level: pyarrow is optional and slow to import
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportError("Parquet export needs pyarrow (pip install pyarrow)")
+    
+    schema = pyarrow.schema([
+        ('id', pyarrow.int64()),
+        ('title', pyarrow.string()),
+        ('artist', pyarrow.string()),
+        ('album', pyarrow.string()),
+        ('release_date', pyarrow.string()),
+        ('genres', pyarrow.string()),
+        ('shazam_count', pyarrow.int64()),
+        ('detected_at', pyarrow.string())
+    ])
+    
+    # Each chunk becomes one row group, so memory stays bounded by the chunk size
+    written = 0
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            writer.write_batch(pyarrow.RecordBatch.from_pylist(chunk, schema=schema))
+            written += len(chunk)
+    return written
+
+
+def export_songs(songs: Iterable[Dict[str, Any]], fmt: str, out: Optional[IO[str]] = None, path: Optional[str] = None,
+                 chunk_size: int = 1000) -> int:
+    """Stream songs to CSV or JSONL (written to `out`) or Parquet (written to `path`), chunk_size rows at a time.
+    
+    Returns the number of songs written.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"Unknown export format: {fmt}")
+    
+    chunks = chunked(songs, chunk_size)
+    if fmt == 'parquet':
+        if not path:
+            raise ExportError("Parquet can't be written to stdout; pass an output file")
+        return _write_parquet(chunks, path)
+    
+    if fmt == 'csv':
+        return _write_csv(chunks, out)
+    return _write_jsonl(chunks, out)
@@ -1,166 +1,225 @@
-import json
 import asyncio
 from datetime import datetime
-from collections import deque
-from typing import Optional, Dict, Any, List
-from ..config import HISTORY_LIMIT, CACHE_DIR
-from ..utils.executor import executor_manager
+from itertools import islice
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Iterator, Set, Tuple
+from ..config import HISTORY_LIMIT, HISTORY_BACKEND
+from .history_store import HistoryBackend, create_history_backend
+from .song import SongRecord
+from .search import SearchIndex
+from ..utils.logger import log
+
+
+class HistoryObserver:
+    """Notified by SongHistory as songs are added and removed (see SongHistory.subscribe)."""
+    
+    def on_song_added(self, song: SongRecord) -> None:
+        pass
+    
+    def on_song_removed(self, song: SongRecord, evicted: bool) -> None:
+        """evicted is True when the song only aged out of the in-memory window and is still stored."""
+        pass
 
 
 class SongHistory:
+    """Recent songs in memory (HISTORY_LIMIT), full history in the configured backend.
+    
+    The in-memory window is an insertion-ordered dict keyed by id, so adding,
+    removing any song and evicting the oldest are all O(1). The search index
+    covers the full stored history once load_index() has built it, and is then
+    kept in step with adds and deletes.
+    """
     
-    def __init__(self, limit: int = HISTORY_LIMIT):
-        self.songs: deque = deque(maxlen=limit)
-        self.songs_by_id: Dict[int, Dict[str, Any]] = {}
-        self.songs_by_key: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, limit: int = HISTORY_LIMIT, backend: Optional[HistoryBackend] = None):
+        self.limit = limit
+        self.songs_by_id: OrderedDict = OrderedDict()
+        self.songs_by_key: Dict[str, SongRecord] = {}
         self.current: Optional[str] = None
         self.current_index: int = 0
-        self.cache_file = CACHE_DIR / "song_history.json"
-        self._cache_dirty = False
-        self._cache_task: Optional[asyncio.Task] = None
-        self._save_counter = 0
+        self.index: Optional[SearchIndex] = None
+        # Songs deleted while load_index() runs, which a backend snapshot may still hand it
+        self._deleted_while_indexing: Optional[Set[int]] = None
+        self.observers: List[HistoryObserver] = []
+        self.backend = backend or create_history_backend(HISTORY_BACKEND, limit)
         self._load_cache()
     
-    def add(self, song_info: Dict[str, Any]) -> tuple[bool, Optional[int]]:
-        song_key = f"{song_info['title']}|{song_info['artist']}"
+    @property
+    def songs(self):
+        """Songs in the window, oldest first."""
+        return self.songs_by_id.values()
+    
+    def subscribe(self, observer: HistoryObserver) -> None:
+        self.observers.append(observer)
+    
+    def add(self, record: SongRecord, detected_at: Optional[str] = None) -> tuple[bool, Optional[int]]:
+        """Store the record itself (no copy), assigning its id and detected_at.
         
-        if song_key in self.songs_by_key:
-            existing_song = self.songs_by_key[song_key]
-            self.current = song_key
-            return False, existing_song.get('id')
+        A song already in the history, in the window or only stored, is not
+        added again; its id is returned instead.
+        """
+        existing = self.get_by_key(record.key)
+        if existing is not None:
+            self.current = record.key
+            return False, existing.id
         
-        if len(self.songs) >= self.songs.maxlen:
-            oldest_song = self.songs[0]
-            oldest_key = f"{oldest_song.get('title', '')}|{oldest_song.get('artist', '')}"
-            oldest_id = oldest_song.get('id')
-            if oldest_key in self.songs_by_key:
-                del self.songs_by_key[oldest_key]
-            if oldest_id in self.songs_by_id:
-                del self.songs_by_id[oldest_id]
+        if len(self.songs_by_id) >= self.limit:
+            evicted = self.songs_by_id.popitem(last=False)[1]
+            self._forget(evicted)
+            for observer in self.observers:
+                observer.on_song_removed(evicted, evicted=True)
         
         self.current_index += 1
-        song_with_id = {
-            **song_info,
-            'id': self.current_index,
-            'detected_at': datetime.now().isoformat()
-        }
-        self.songs.append(song_with_id)
-        self.songs_by_id[self.current_index] = song_with_id
-        self.songs_by_key[song_key] = song_with_id
-        self.current = song_key
+        record.id = self.current_index
+        record.detected_at = detected_at or datetime.now().isoformat()
+        self.songs_by_id[record.id] = record
+        self.songs_by_key[record.key] = record
+        if self.index is not None:
+            self.index.add(record.id, record.title, record.artist, record.album)
+        self.current = record.key
         
-        song_info['id'] = self.current_index
+        self.backend.append(record)
+        for observer in self.observers:
+            observer.on_song_added(record)
         
-        self._cache_dirty = True
-        self._save_counter += 1
-        if self._save_counter >= 10:
-            self._schedule_cache_save()
-            self._save_counter = 0
-        
-        self._log_detection(song_with_id)
+        self._log_detection(record)
         return True, self.current_index
     
     def remove(self, song_id: int) -> bool:
-        """Remove a song by its ID."""
-        if song_id not in self.songs_by_id:
-            return False
-            
-        song = self.songs_by_id.pop(song_id)
-        song_key = f"{song.get('title', '')}|{song.get('artist', '')}"
+        """Remove a song by its ID, whether it is in the window or only stored."""
+        record = self.songs_by_id.pop(song_id, None)
+        if record is not None:
+            self._forget(record)
+        else:
+            song = self.backend.get(song_id)
+            if song is None:
+                return False
+            record = SongRecord.from_dict(song)
         
-        if song_key in self.songs_by_key:
-            del self.songs_by_key[song_key]
-            
-        # Reconstruct deque without the removed song
-        self.songs = deque([s for s in self.songs if s['id'] != song_id], maxlen=self.songs.maxlen)
-        
-        self._cache_dirty = True
-        self.force_save_cache()
+        self.backend.delete(song_id)
+        if self.index is not None:
+            self.index.remove(song_id)
+        if self._deleted_while_indexing is not None:
+            self._deleted_while_indexing.add(song_id)
+        for observer in self.observers:
+            observer.on_song_removed(record, evicted=False)
         return True
     
-    def get_by_id(self, song_id: int) -> Optional[Dict[str, Any]]:
-        return self.songs_by_id.get(song_id)
+    def _forget(self, record: SongRecord) -> None:
+        if self.songs_by_key.get(record.key) is record:
+            del self.songs_by_key[record.key]
+    
+    def get_by_id(self, song_id: int) -> Optional[SongRecord]:
+        record = self.songs_by_id.get(song_id)
+        if record is None:
+            song = self.backend.get(song_id)
+            record = SongRecord.from_dict(song) if song else None
+        return record
+    
+    def get_many(self, song_ids: List[int]) -> List[SongRecord]:
+        """Records for a page of ids, in the same order: from the window, or in one backend read."""
+        window = self.songs_by_id
+        missing = [song_id for song_id in song_ids if song_id not in window]
+        stored = {song['id']: SongRecord.from_dict(song) for song in self.backend.get_many(missing)} if missing else {}
+        return [record for record in (window.get(song_id) or stored.get(song_id) for song_id in song_ids) if record]
+    
+    def get_by_key(self, key: str) -> Optional[SongRecord]:
+        """Most recent detection of a title|artist key, including songs outside the window."""
+        record = self.songs_by_key.get(key)
+        if record is None:
+            song = self.backend.find_by_key(key)
+            record = SongRecord.from_dict(song) if song else None
+        return record
+    
+    def search(self, query: str) -> List[int]:
+        """Ids of the stored songs whose title, artist or album words start with each query word.
+        
+        Oldest first. Finds nothing until load_index() has finished.
+        """
+        return self.index.search(query) if self.index is not None else []
     
-    def get_recent(self, limit: int = 10) -> List[Dict[str, Any]]:
-        return list(self.songs)[-limit:] if self.songs else []
+    def search_newest(self, query: str, limit: int) -> Tuple[List[int], bool]:
+        """The newest `limit` ids search() would return, and whether there may be more (see SearchIndex.search_newest)."""
+        return self.index.search_newest(query, limit) if self.index is not None else ([], False)
+    
+    async def load_index(self, batch_size: int = 1000) -> None:
+        """Build the search index over the full stored history, a batch at a time between other loop work.
+        
+        Postings must stay in id order, so songs added meanwhile are indexed
+        after the stored ones, and songs deleted meanwhile are left out.
+        """
+        if self.index is not None or self._deleted_while_indexing is not None:
+            return
+        
+        index = SearchIndex()
+        last_id = self.current_index
+        self._deleted_while_indexing = deleted = set()
+        try:
+            songs = self.backend.iter_songs(batch_size)
+            while True:
+                batch = list(islice(songs, batch_size))
+                for song in batch:
+                    song_id = song.get('id')
+                    if song_id and song_id <= last_id and song_id not in deleted:
+                        index.add(song_id, song.get('title'), song.get('artist'), song.get('album'))
+                if len(batch) < batch_size:
+                    break
+                await asyncio.sleep(0)
+            
+            for record in self.get_many(list(range(last_id + 1, self.current_index + 1))):
+                index.add(record.id, record.title, record.artist, record.album)
+            self.index = index
+        except Exception as e:
+            log(f"Warning: Could not index the full history for search: {e}", "WARNING")
+        finally:
+            self._deleted_while_indexing = None
+    
+    def get_recent(self, limit: int = 10) -> List[SongRecord]:
+        if limit <= len(self.songs_by_id):
+            recent = list(islice(reversed(self.songs_by_id.values()), limit))
+            recent.reverse()
+            return recent
+        return [SongRecord.from_dict(song) for song in self.backend.recent(limit)]
+    
+    def iter_songs(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """The full stored history, oldest first, streamed from the backend."""
+        return self.backend.iter_songs(batch_size)
     
     def get_stats(self) -> Optional[Dict[str, Any]]:
-        if not self.songs:
+        if not self.songs_by_id:
             return None
         
         return {
-            'total': len(self.songs),
-            'artists': len(set(s['artist'] for s in self.songs)),
-            'avg_shazam_count': sum(s['shazam_count'] for s in self.songs) // len(self.songs) if self.songs else 0
+            'total': len(self.songs_by_id),
+            'artists': len(set(s.artist for s in self.songs)),
+            'avg_shazam_count': sum(s.shazam_count for s in self.songs) // len(self.songs_by_id),
+            'all_time': self.backend.count()
         }
     
-    def _schedule_cache_save(self):
-        if self._cache_task and not self._cache_task.done():
-            self._cache_task.cancel()
+    def _load_cache(self) -> None:
+        # Outside any try: new ids must continue from the stored ones, or they would collide
+        self.current_index = self.backend.max_id()
         
-        self._cache_task = asyncio.create_task(self._async_save_cache())
-    
-    async def _async_save_cache(self):
         try:
-            await asyncio.sleep(0.5)
-            
-            if self._cache_dirty:
-                await executor_manager.run_in_executor(self._save_cache_sync)
-                self._cache_dirty = False
-                self._save_counter = 0
-        except asyncio.CancelledError:
-            pass
-        except Exception:
-            pass  # Silent fail for cache save
-    
-    def _save_cache_sync(self):
-        try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(list(self.songs), f, indent=2)
-        except Exception:
-            pass  # Silent fail for cache save
-    
-    def _load_cache(self) -> None:
-        if self.cache_file.exists():
+            songs = self.backend.load_recent(self.limit)
+        except Exception as e:
+            log(f"Warning: Could not load recent history: {e}", "WARNING")
+            return
+        
+        for song in songs:
             try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.songs = deque(data, maxlen=HISTORY_LIMIT)
-                    
-                    self.songs_by_id = {song.get('id'): song for song in self.songs if song.get('id')}
-                    self.songs_by_key = {}
-                    for song in self.songs:
-                        song_key = f"{song.get('title', '')}|{song.get('artist', '')}"
-                        if song_key and song_key != '|':
-                            self.songs_by_key[song_key] = song
-                    
-                    if self.songs:
-                        self.current_index = max(s.get('id', 0) for s in self.songs)
-                        
-            except json.JSONDecodeError:
-                pass  # Silent fail for corrupted cache
-            except Exception:
-                pass  # Silent fail for cache load
-    
-    def force_save_cache(self):
-        try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(list(self.songs), f, indent=2)
-            self._cache_dirty = False
-            self._save_counter = 0
-        except Exception:
-            pass  # Silent fail for cache save
-    
-    def _log_detection(self, song_info: Dict[str, Any]) -> None:
+                if not song.get('id'):
+                    continue
+                record = SongRecord.from_dict(song)
+            except Exception as e:
+                log(f"Warning: Skipping unreadable history entry {song!r:.80}: {e}", "WARNING")
+                continue
+            self.songs_by_id[record.id] = record
+            if record.key != '|':
+                self.songs_by_key[record.key] = record
+    
+    def _log_detection(self, song_info: SongRecord) -> None:
         """Log detection - currently disabled for performance."""
         pass
     
     async def cleanup(self):
-        if self._cache_task and not self._cache_task.done():
-            self._cache_task.cancel()
-            try:
-                await self._cache_task
-            except asyncio.CancelledError:
-                pass
-        
-        self.force_save_cache()
+        await self.backend.close()
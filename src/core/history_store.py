@@ -0,0 +1,522 @@
+import os
+import json
+import sqlite3
+import asyncio
+from abc import ABC, abstractmethod
+from pathlib import Path
+from itertools import islice
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Union, Iterator
+from ..config import CACHE_DIR, JOURNAL_COMPACT_OPS, DEDUP_POLICY
+from ..utils.logger import log
+from ..utils.executor import executor_manager
+from .song import RECORD_FIELDS, DEDUP_POLICIES, SongRecord, dedup_key, song_key
+
+
+def to_record(song: Union[SongRecord, Dict[str, Any]]) -> Dict[str, Any]:
+    """The persisted part of a song; display fields added by the UI are left out."""
+    if isinstance(song, SongRecord):
+        return song.to_dict()
+    return {field: song.get(field) for field in RECORD_FIELDS}
+
+
+class HistoryBackend(ABC):
+    """Where SongHistory persists songs. SongHistory keeps the recent window in memory."""
+    
+    @abstractmethod
+    def load_recent(self, limit: int) -> List[Dict[str, Any]]:
+        pass
+    
+    @abstractmethod
+    def max_id(self) -> int:
+        pass
+    
+    @abstractmethod
+    def get(self, song_id: int) -> Optional[Dict[str, Any]]:
+        pass
+    
+    @abstractmethod
+    def get_many(self, song_ids: List[int]) -> List[Dict[str, Any]]:
+        """The stored songs among song_ids, oldest first; meant for a page of rows."""
+        pass
+    
+    @abstractmethod
+    def ids_before(self, song_id: int) -> List[int]:
+        """Ids of every stored song older than song_id, oldest first."""
+        pass
+    
+    @abstractmethod
+    def find_by_key(self, key: str) -> Optional[Dict[str, Any]]:
+        pass
+    
+    @abstractmethod
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        pass
+    
+    @abstractmethod
+    def iter_songs(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Every stored song, oldest first, read batch_size rows at a time where the store allows."""
+        pass
+    
+    @abstractmethod
+    def count(self) -> int:
+        pass
+    
+    @abstractmethod
+    def append(self, song: SongRecord) -> None:
+        pass
+    
+    @abstractmethod
+    def delete(self, song_id: int) -> None:
+        pass
+    
+    async def close(self) -> None:
+        pass
+
+
+class JSONHistoryBackend(HistoryBackend):
+    """Legacy store: the last `limit` songs as one JSON file, rewritten in full."""
+    
+    def __init__(self, limit: int, path: Path = CACHE_DIR / "song_history.json"):
+        self.limit = limit
+        self.cache_file = path
+        self.songs: List[Dict[str, Any]] = []
+        self._cache_dirty = False
+        self._cache_task: Optional[asyncio.Task] = None
+        self._save_counter = 0
+        self._load_cache()
+    
+    def load_recent(self, limit: int) -> List[Dict[str, Any]]:
+        return [dict(song) for song in self.songs[-limit:]]
+    
+    def max_id(self) -> int:
+        return max((song.get('id') or 0 for song in self.songs), default=0)
+    
+    def get(self, song_id: int) -> Optional[Dict[str, Any]]:
+        return next((dict(song) for song in self.songs if song.get('id') == song_id), None)
+    
+    def get_many(self, song_ids: List[int]) -> List[Dict[str, Any]]:
+        wanted = set(song_ids)
+        return [dict(song) for song in self.songs if song.get('id') in wanted]
+    
+    def ids_before(self, song_id: int) -> List[int]:
+        return [song['id'] for song in self.songs if (song.get('id') or 0) and song['id'] < song_id]
+    
+    def find_by_key(self, key: str) -> Optional[Dict[str, Any]]:
+        return next((dict(song) for song in reversed(self.songs) if song_key(song) == key), None)
+    
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        return self.load_recent(limit)
+    
+    def iter_songs(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        for song in list(self.songs):
+            yield dict(song)
+    
+    def count(self) -> int:
+        return len(self.songs)
+    
+    def append(self, song: SongRecord) -> None:
+        self.songs.append(to_record(song))
+        if len(self.songs) > self.limit:
+            del self.songs[:len(self.songs) - self.limit]
+        
+        self._cache_dirty = True
+        self._save_counter += 1
+        if self._save_counter >= 10:
+            self._schedule_cache_save()
+            self._save_counter = 0
+    
+    def delete(self, song_id: int) -> None:
+        self.songs = [song for song in self.songs if song.get('id') != song_id]
+        self._cache_dirty = True
+        self.force_save_cache()
+    
+    def _schedule_cache_save(self):
+        if self._cache_task and not self._cache_task.done():
+            self._cache_task.cancel()
+        
+        self._cache_task = asyncio.create_task(self._async_save_cache())
+    
+    async def _async_save_cache(self):
+        try:
+            await asyncio.sleep(0.5)
+            
+            if self._cache_dirty:
+                await executor_manager.run_in_executor(self._save_cache_sync)
+                self._cache_dirty = False
+                self._save_counter = 0
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            pass  # Silent fail for cache save
+    
+    def _save_cache_sync(self):
+        try:
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump(list(self.songs), f, indent=2)
+        except Exception:
+            pass  # Silent fail for cache save
+    
+    def _load_cache(self) -> None:
+        if self.cache_file.exists():
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self.songs = [to_record(song) for song in json.load(f)][-self.limit:]
+            except json.JSONDecodeError:
+                pass  # Silent fail for corrupted cache
+            except Exception:
+                pass  # Silent fail for cache load
+    
+    def force_save_cache(self):
+        try:
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump(list(self.songs), f, indent=2)
+            self._cache_dirty = False
+            self._save_counter = 0
+        except Exception:
+            pass  # Silent fail for cache save
+    
+    async def close(self):
+        if self._cache_task and not self._cache_task.done():
+            self._cache_task.cancel()
+            try:
+                await self._cache_task
+            except asyncio.CancelledError:
+                pass
+        
+        self.force_save_cache()
+
+
+class SQLiteHistoryBackend(HistoryBackend):
+    """Unbounded history in SQLite (WAL mode), with indexed lookups by id, key and time.
+    
+    Each add/remove is a single-row statement. In WAL mode with synchronous=NORMAL a
+    commit is an append to the WAL without an fsync, cheap enough to run on the event loop.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS songs (
+            id INTEGER PRIMARY KEY,
+            song_key TEXT NOT NULL,
+            title TEXT,
+            artist TEXT,
+            album TEXT,
+            release_date TEXT,
+            genres TEXT,
+            shazam_count INTEGER,
+            detected_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_songs_key ON songs(song_key);
+        CREATE INDEX IF NOT EXISTS idx_songs_detected_at ON songs(detected_at);
+    """
+    
+    COLUMNS = ', '.join(RECORD_FIELDS)
+    
+    def __init__(self, path: Path = CACHE_DIR / "song_history.db", legacy_json: Path = CACHE_DIR / "song_history.json"):
+        self.db_file = path
+        self._conn = sqlite3.connect(str(path), isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        
+        if self.count() == 0 and legacy_json.exists():
+            self._import_json(legacy_json)
+        self._rekey()
+    
+    def _rekey(self) -> None:
+        """Rebuild stored song keys if DEDUP_POLICY changed since they were written.
+        
+        The policy's index in DEDUP_POLICIES is kept in user_version; databases
+        from before dedup policies have 0, which is "exact".
+        """
+        policy = DEDUP_POLICIES.index(DEDUP_POLICY)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] == policy:
+            return
+        
+        try:
+            rows = self._conn.execute("SELECT id, title, artist FROM songs").fetchall()
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "UPDATE songs SET song_key = ? WHERE id = ?",
+                    [(dedup_key(row['title'], row['artist']), row['id']) for row in rows]
+                )
+                self._conn.execute(f"PRAGMA user_version = {policy}")
+        except sqlite3.Error as e:
+            log(f"Warning: Could not rebuild history keys: {e}", "WARNING")
+    
+    def _import_json(self, path: Path) -> None:
+        """One-time migration of the old JSON history file."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                songs = [song for song in json.load(f) if song.get('id')]
+            
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    f"INSERT OR IGNORE INTO songs (song_key, {self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [self._row(song) for song in songs]
+                )
+        except Exception as e:
+            log(f"Warning: Could not import JSON history: {e}", "WARNING")
+    
+    def _row(self, song: Dict[str, Any]) -> tuple:
+        record = to_record(song)
+        record['detected_at'] = record['detected_at'] or ''
+        return (song_key(record),) + tuple(record[field] for field in RECORD_FIELDS)
+    
+    def _fetch(self, sql: str, *params) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self._conn.execute(sql, params)]
+    
+    def load_recent(self, limit: int) -> List[Dict[str, Any]]:
+        return self.recent(limit)
+    
+    def max_id(self) -> int:
+        return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM songs").fetchone()[0]
+    
+    def get(self, song_id: int) -> Optional[Dict[str, Any]]:
+        rows = self._fetch(f"SELECT {self.COLUMNS} FROM songs WHERE id = ?", song_id)
+        return rows[0] if rows else None
+    
+    def get_many(self, song_ids: List[int]) -> List[Dict[str, Any]]:
+        # A page of rows is a few dozen primary-key lookups; stay well under SQLite's bound-parameter limit
+        song_ids, rows = sorted(song_ids), []
+        for start in range(0, len(song_ids), 500):
+            chunk = song_ids[start:start + 500]
+            rows += self._fetch(
+                f"SELECT {self.COLUMNS} FROM songs WHERE id IN ({', '.join('?' * len(chunk))}) ORDER BY id", *chunk
+            )
+        return rows
+    
+    def ids_before(self, song_id: int) -> List[int]:
+        return [row[0] for row in self._conn.execute("SELECT id FROM songs WHERE id < ? ORDER BY id", (song_id,))]
+    
+    def find_by_key(self, key: str) -> Optional[Dict[str, Any]]:
+        rows = self._fetch(f"SELECT {self.COLUMNS} FROM songs WHERE song_key = ? ORDER BY id DESC LIMIT 1", key)
+        return rows[0] if rows else None
+    
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        rows = self._fetch(f"SELECT {self.COLUMNS} FROM songs ORDER BY id DESC LIMIT ?", limit)
+        rows.reverse()
+        return rows
+    
+    def iter_songs(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        # Keyset pagination: each batch is an index range scan, however far in
+        last_id = 0
+        while True:
+            rows = self._fetch(f"SELECT {self.COLUMNS} FROM songs WHERE id > ? ORDER BY id LIMIT ?", last_id, batch_size)
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1]['id']
+    
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0]
+    
+    def append(self, song: SongRecord) -> None:
+        try:
+            self._conn.execute(
+                f"INSERT INTO songs (song_key, {self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._row(song)
+            )
+        except sqlite3.Error as e:
+            log(f"Warning: Could not save song to history: {e}", "WARNING")
+    
+    def delete(self, song_id: int) -> None:
+        try:
+            self._conn.execute("DELETE FROM songs WHERE id = ?", (song_id,))
+        except sqlite3.Error as e:
+            log(f"Warning: Could not remove song from history: {e}", "WARNING")
+    
+    async def close(self):
+        try:
+            self._conn.close()
+        except sqlite3.Error:
+            pass
+
+
+class JournalHistoryBackend(HistoryBackend):
+    """Unbounded history as a snapshot file plus an append-only JSONL journal.
+    
+    Every add/remove is one fsynced line appended to the journal, so nothing is lost
+    however abruptly the app exits. After JOURNAL_COMPACT_OPS lines the journal is
+    rotated and folded into a new snapshot in the background. Journal operations are
+    idempotent, so replaying snapshot + rotated journal + journal at startup always
+    rebuilds the same state, even after a crash in the middle of a compaction.
+    """
+    
+    def __init__(self, directory: Path = CACHE_DIR, compact_ops: int = JOURNAL_COMPACT_OPS):
+        self.snapshot_file = directory / "song_history.snapshot.json"
+        self.journal_file = directory / "song_history.journal.jsonl"
+        self.rotated_file = directory / "song_history.journal.old.jsonl"
+        self.compact_ops = compact_ops
+        self.songs: OrderedDict = OrderedDict()
+        # Ids stored under each key; more than one only for detections kept from before dedup covered the full history
+        self.ids_by_key: Dict[str, List[int]] = {}
+        self._max_id = 0
+        self._journal_ops = 0
+        self._compact_task: Optional[asyncio.Task] = None
+        self._replay()
+        self._journal = self._open_journal()
+    
+    def _open_journal(self):
+        journal = open(self.journal_file, 'a', encoding='utf-8')
+        # Terminate a torn last line so the next entry starts on a line of its own
+        if journal.tell() > 0:
+            with open(self.journal_file, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    journal.write('\n')
+        return journal
+    
+    def _apply(self, op: Dict[str, Any]) -> None:
+        if op.get('op') == 'add':
+            song = op['song']
+            replaced = self.songs.pop(song['id'], None)
+            if replaced is not None:
+                self._unkey(replaced)
+            self.songs[song['id']] = song
+            self.ids_by_key.setdefault(song_key(song), []).append(song['id'])
+            self._max_id = max(self._max_id, song['id'])
+        elif op.get('op') == 'remove':
+            song = self.songs.pop(op['id'], None)
+            if song is not None:
+                self._unkey(song)
+    
+    def _unkey(self, song: Dict[str, Any]) -> None:
+        key = song_key(song)
+        ids = self.ids_by_key.get(key)
+        if ids and song['id'] in ids:
+            ids.remove(song['id'])
+            if not ids:
+                del self.ids_by_key[key]
+    
+    def _replay(self) -> None:
+        try:
+            if self.snapshot_file.exists():
+                with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                    for song in json.load(f):
+                        self._apply({'op': 'add', 'song': song})
+        except Exception as e:
+            log(f"Warning: Could not load history snapshot: {e}", "WARNING")
+        
+        for path in (self.rotated_file, self.journal_file):
+            if not path.exists():
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            self._apply(json.loads(line))
+                        except (json.JSONDecodeError, KeyError, TypeError):
+                            pass  # A torn last line from a crash mid-write
+                        if path == self.journal_file:
+                            self._journal_ops += 1
+            except Exception as e:
+                log(f"Warning: Could not replay history journal: {e}", "WARNING")
+    
+    def _write(self, op: Dict[str, Any]) -> None:
+        self._apply(op)
+        try:
+            self._journal.write(json.dumps(op) + '\n')
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        except Exception as e:
+            log(f"Warning: Could not write history journal: {e}", "WARNING")
+        
+        self._journal_ops += 1
+        if self._journal_ops >= self.compact_ops and (self._compact_task is None or self._compact_task.done()):
+            self._compact_task = asyncio.create_task(self._compact())
+    
+    async def _compact(self) -> None:
+        # Rotate on the event loop so later appends go to a fresh journal, then
+        # write the snapshot off the loop; the rotated journal is dropped only once
+        # the new snapshot is safely in place
+        try:
+            snapshot = list(self.songs.values())
+            self._journal.close()
+            if not self.rotated_file.exists():
+                os.replace(self.journal_file, self.rotated_file)
+            self._journal = self._open_journal()
+            self._journal_ops = 0
+            
+            await executor_manager.run_in_executor(self._write_snapshot_sync, snapshot)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            log(f"Warning: History compaction failed: {e}", "WARNING")
+            if self._journal.closed:
+                self._journal = self._open_journal()
+    
+    def _write_snapshot_sync(self, snapshot: List[Dict[str, Any]]) -> None:
+        tmp_file = self.snapshot_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.snapshot_file)
+        os.unlink(self.rotated_file)
+    
+    def load_recent(self, limit: int) -> List[Dict[str, Any]]:
+        return self.recent(limit)
+    
+    def max_id(self) -> int:
+        return self._max_id
+    
+    def get(self, song_id: int) -> Optional[Dict[str, Any]]:
+        song = self.songs.get(song_id)
+        return dict(song) if song is not None else None
+    
+    def get_many(self, song_ids: List[int]) -> List[Dict[str, Any]]:
+        return [dict(self.songs[song_id]) for song_id in sorted(song_ids) if song_id in self.songs]
+    
+    def ids_before(self, song_id: int) -> List[int]:
+        # Ids are stored in the order they were assigned, so they are already sorted
+        return [stored_id for stored_id in self.songs if stored_id < song_id]
+    
+    def find_by_key(self, key: str) -> Optional[Dict[str, Any]]:
+        ids = self.ids_by_key.get(key)
+        return self.get(max(ids)) if ids else None
+    
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        songs = [dict(song) for song in islice(reversed(self.songs.values()), limit)]
+        songs.reverse()
+        return songs
+    
+    def iter_songs(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        for song in list(self.songs.values()):
+            yield dict(song)
+    
+    def count(self) -> int:
+        return len(self.songs)
+    
+    def append(self, song: SongRecord) -> None:
+        if song.id in self.songs:
+            log(f"Warning: Not saving song #{song.id}: that id is already stored", "WARNING")
+            return
+        self._write({'op': 'add', 'song': to_record(song)})
+    
+    def delete(self, song_id: int) -> None:
+        self._write({'op': 'remove', 'id': song_id})
+    
+    async def close(self):
+        # Journal lines are already durable; only an in-flight compaction is worth finishing
+        if self._compact_task and not self._compact_task.done():
+            try:
+                await self._compact_task
+            except Exception:
+                pass
+        
+        try:
+            self._journal.close()
+        except Exception:
+            pass
+
+
+def create_history_backend(name: str, limit: int) -> HistoryBackend:
+    if name == 'json':
+        return JSONHistoryBackend(limit)
+    if name == 'journal':
+        return JournalHistoryBackend()
+    return SQLiteHistoryBackend()
@@ -0,0 +1,291 @@
+import os
+import json
+import time
+import base64
+import asyncio
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+from shazamio.signature import DATA_URI_PREFIX, DecodedMessage
+from ..config import (
+    CACHE_DIR, RECOGNITION_CACHE_SIZE, RECOGNITION_CACHE_TTL_HOURS, RECOGNITION_CACHE_THRESHOLD
+)
+from .song import SongRecord
+from ..utils.logger import log
+from ..utils.executor import executor_manager
+from ..utils.metrics import metrics
+
+
+# Peaks each peak is paired with, and the shortest and longest gap of a pair in FFT passes
+# (128 samples each at 16 kHz); pairs closer than ~64 ms describe one note's timbre, not the music
+LANDMARK_FAN_OUT = 15
+LANDMARK_MIN_GAP = 8
+LANDMARK_MAX_GAP = 96
+# Offsets within this many passes count as the same alignment
+LANDMARK_OFFSET_STEP = 4
+# Fewest aligned landmarks for a hit however short the window, and how far the best
+# alignment must beat any other
+LANDMARK_MIN_MATCHES = 20
+LANDMARK_MARGIN = 1.5
+
+
+def signature_key(uri: str) -> str:
+    """Content address of a Shazam signature: a hash of its data URI."""
+    return hashlib.blake2b(uri.encode('ascii'), digest_size=12).hexdigest()
+
+
+def signature_landmarks(uri: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Peak-pair hashes of a Shazam signature and the FFT pass each pair starts at.
+    
+    Every spectral peak is paired with the next LANDMARK_FAN_OUT peaks; a pair
+    hashes both frequencies and the time between them, which stays the same
+    wherever in the track the window was cut. Frequencies are taken at half
+    resolution and gaps in steps of two passes to absorb a bin of jitter.
+    """
+    message = DecodedMessage.decode_from_binary(base64.b64decode(uri[len(DATA_URI_PREFIX):]))
+    peaks = sorted(
+        (peak.fft_pass_number, peak.corrected_peak_frequency_bin)
+        for band_peaks in message.frequency_band_to_sound_peaks.values() for peak in band_peaks
+    )
+    if len(peaks) < 2:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+    
+    peaks = np.asarray(peaks, dtype=np.int32)
+    times, bins = peaks[:, 0], peaks[:, 1] >> 7
+    hashes, starts = [], []
+    for step in range(1, min(LANDMARK_FAN_OUT, len(peaks) - 1) + 1):
+        gap = times[step:] - times[:-step]
+        paired = (gap >= LANDMARK_MIN_GAP) & (gap <= LANDMARK_MAX_GAP)
+        hashes.append((bins[:-step][paired] << 20) | (bins[step:][paired] << 8) | (gap[paired] >> 1))
+        starts.append(times[:-step][paired])
+    return np.concatenate(hashes), np.concatenate(starts)
+
+
+class RecognitionCache:
+    """Maps Shazam signatures to recognition results, so repeat plays resolve locally.
+    
+    Entries are kept in LRU order and expire after RECOGNITION_CACHE_TTL_HOURS.
+    A lookup tries the exact signature first, then matches landmarks the way
+    Shazam does: a hit needs RECOGNITION_CACHE_THRESHOLD of the window's peak
+    pairs to occur in one cached signature at a single time offset, clearly
+    ahead of any other offset. Windows of a repeat play that overlap a cached
+    window line up; songs that merely share chords or timbre do not.
+    """
+    
+    def __init__(self, max_size: int = RECOGNITION_CACHE_SIZE, ttl_hours: float = RECOGNITION_CACHE_TTL_HOURS,
+                 threshold: float = RECOGNITION_CACHE_THRESHOLD):
+        self.max_size = max_size
+        self.ttl = ttl_hours * 3600
+        self.threshold = threshold
+        self.cache_file = CACHE_DIR / "recognition_cache.json"
+        self.entries: OrderedDict = OrderedDict()
+        # Landmarks of every entry, sorted by hash; `_owners` holds the entry number of each
+        self._hashes = np.empty(0, dtype=np.int32)
+        self._times = np.empty(0, dtype=np.int32)
+        self._owners = np.empty(0, dtype=np.int32)
+        self._numbers: Dict[str, int] = {}
+        self._keys: Dict[int, str] = {}
+        self._next_number = 0
+        self._cache_dirty = False
+        self._cache_task: Optional[asyncio.Task] = None
+        # A cancelled save's write may still be running in the executor when the next one starts
+        self._file_lock = threading.Lock()
+        self._load_cache()
+    
+    def get(self, uri: Optional[str]) -> Optional[SongRecord]:
+        if not uri:
+            return None
+        
+        self._expire()
+        if not self.entries:
+            return None
+        
+        key = signature_key(uri)
+        if key not in self.entries:
+            key = self._match(uri)
+            if key is None:
+                metrics.increment('cache_misses')
+                return None
+        
+        self.entries.move_to_end(key)
+        metrics.increment('cache_hits')
+        return SongRecord.from_dict(self.entries[key]['song'])
+    
+    def put(self, uri: Optional[str], song: SongRecord) -> None:
+        if not uri:
+            return
+        
+        key = signature_key(uri)
+        if key in self.entries:
+            self._drop(key)
+        try:
+            hashes, times, owners = self._add(
+                key, uri, {k: v for k, v in song.to_dict().items() if k not in ('id', 'detected_at')}, time.time()
+            )
+        except Exception as e:
+            log(f"Warning: Could not cache signature: {e}", "WARNING")
+            return
+        
+        at = np.searchsorted(self._hashes, hashes)
+        self._hashes = np.insert(self._hashes, at, hashes)
+        self._times = np.insert(self._times, at, times)
+        self._owners = np.insert(self._owners, at, owners)
+        
+        while len(self.entries) > self.max_size:
+            self._drop(next(iter(self.entries)))
+        
+        self._cache_dirty = True
+        self._schedule_cache_save()
+    
+    def _add(self, key: str, uri: str, song: Dict[str, Any], stored_at: float) -> Tuple[np.ndarray, ...]:
+        """Registers an entry and returns its landmarks sorted by hash, for the caller to index."""
+        hashes, times = signature_landmarks(uri)
+        number = self._next_number
+        self._next_number += 1
+        self.entries[key] = {'uri': uri, 'song': song, 'stored_at': stored_at}
+        self._numbers[key] = number
+        self._keys[number] = key
+        
+        order = np.argsort(hashes, kind='stable')
+        return hashes[order], times[order], np.full(len(hashes), number, dtype=np.int32)
+    
+    def _drop(self, key: str) -> None:
+        del self.entries[key]
+        number = self._numbers.pop(key)
+        del self._keys[number]
+        kept = self._owners != number
+        self._hashes, self._times, self._owners = self._hashes[kept], self._times[kept], self._owners[kept]
+    
+    def _match(self, uri: str) -> Optional[str]:
+        try:
+            hashes, times = signature_landmarks(uri)
+        except Exception as e:
+            log(f"Warning: Could not read signature for cache lookup: {e}", "WARNING")
+            return None
+        if not len(hashes):
+            return None
+        
+        first = np.searchsorted(self._hashes, hashes, 'left')
+        counts = np.searchsorted(self._hashes, hashes, 'right') - first
+        total = int(counts.sum())
+        if not total:
+            return None
+        
+        # Every (cached landmark, window landmark) pair with the same hash votes for
+        # its entry and the time offset between the two
+        ends = np.cumsum(counts)
+        positions = np.arange(total) - np.repeat(ends - counts, counts) + np.repeat(first, counts)
+        offsets = (self._times[positions].astype(np.int64) - np.repeat(times, counts)) // LANDMARK_OFFSET_STEP
+        owners = self._owners[positions].astype(np.int64)
+        candidates, aligned = np.unique((owners << 32) | (offsets + (1 << 31)), return_counts=True)
+        
+        # An alignment can straddle two offset steps, so each also gets the votes of the next one
+        spill = np.zeros_like(aligned)
+        spill[:-1] = np.where(candidates[1:] == candidates[:-1] + 1, aligned[1:], 0)
+        aligned = aligned + spill
+        
+        best = int(np.argmax(aligned))
+        key = self._keys[int(candidates[best] >> 32)]
+        
+        # Material shared by different songs matches weakly at many offsets; a real match has one
+        # alignment that clearly beats every other, except those of other windows of the same song
+        title = self.entries[key]['song'].get('title'), self.entries[key]['song'].get('artist')
+        other = np.abs(candidates - candidates[best]) > 1
+        for number in np.unique(candidates >> 32):
+            song = self.entries[self._keys[int(number)]]['song']
+            if number != candidates[best] >> 32 and (song.get('title'), song.get('artist')) == title:
+                other &= (candidates >> 32) != number
+        runner_up = int(aligned[other].max()) if other.any() else 0
+        
+        if aligned[best] < max(LANDMARK_MIN_MATCHES, self.threshold * len(hashes), LANDMARK_MARGIN * runner_up):
+            return None
+        return key
+    
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl
+        expired = [key for key, entry in self.entries.items() if entry['stored_at'] < cutoff]
+        for key in expired:
+            self._drop(key)
+        
+        if expired:
+            self._cache_dirty = True
+    
+    def _schedule_cache_save(self):
+        if self._cache_task and not self._cache_task.done():
+            self._cache_task.cancel()
+        
+        self._cache_task = asyncio.create_task(self._async_save_cache())
+    
+    async def _async_save_cache(self):
+        try:
+            await asyncio.sleep(0.5)
+            
+            if self._cache_dirty:
+                data = self._serialize()
+                self._cache_dirty = False
+                await executor_manager.run_in_executor(self._write_cache_sync, data)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            log(f"Warning: Could not save recognition cache: {e}", "WARNING")
+    
+    def _serialize(self) -> list:
+        return [
+            {
+                'uri': entry['uri'],
+                'song': entry['song'],
+                'stored_at': entry['stored_at']
+            }
+            for key, entry in self.entries.items()
+        ]
+    
+    def _write_cache_sync(self, data: list) -> None:
+        # Write a temp file and swap it in, so a crash mid-write keeps the previous cache
+        try:
+            with self._file_lock:
+                tmp_file = self.cache_file.with_suffix('.tmp')
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            log(f"Warning: Could not save recognition cache: {e}", "WARNING")
+    
+    def _load_cache(self) -> None:
+        if not self.cache_file.exists():
+            return
+        
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            
+            cutoff = time.time() - self.ttl
+            # Entries written before the cache was keyed by signature have no 'uri' and are dropped
+            landmarks = []
+            for item in data[-self.max_size:]:
+                if 'uri' not in item or item['stored_at'] < cutoff:
+                    continue
+                key = signature_key(item['uri'])
+                if key not in self.entries:
+                    landmarks.append(self._add(key, item['uri'], item['song'], item['stored_at']))
+            if landmarks:
+                hashes, times, owners = (np.concatenate(arrays) for arrays in zip(*landmarks))
+                order = np.argsort(hashes, kind='stable')
+                self._hashes, self._times, self._owners = hashes[order], times[order], owners[order]
+        except json.JSONDecodeError as e:
+            log(f"Warning: Corrupted recognition cache file: {e}", "WARNING")
+        except Exception as e:
+            log(f"Warning: Could not load recognition cache: {e}", "WARNING")
+    
+    async def cleanup(self):
+        if self._cache_task and not self._cache_task.done():
+            self._cache_task.cancel()
+            try:
+                await self._cache_task
+            except asyncio.CancelledError:
+                pass
+        
+        if self._cache_dirty:
+            self._write_cache_sync(self._serialize())
+            self._cache_dirty = False
@@ -1,49 +1,258 @@
+import io
 import os
+import time
+import wave
 import asyncio
-from typing import Optional, Dict, Any
+import aiohttp
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Union
 from shazamio import Shazam
+from shazamio.exceptions import FailedDecodeJson
+from shazamio.interfaces.client import HTTPClientInterface
+from shazamio.utils import validate_json
+from shazamio_core import Recognizer
+from ..config import (
+    RATE, RECORD_SECONDS, SHAZAM_REQUESTS_PER_MINUTE, SHAZAM_BURST, CIRCUIT_BREAKER_FAILURES,
+    CIRCUIT_BREAKER_RESET_SECONDS
+)
+from .backlog import RecognitionBacklog
+from .recognition_cache import RecognitionCache
+from .song import SongRecord
 from ..utils.logger import log
-from ..utils.retry import async_retry
+from ..utils.retry import async_retry, CircuitBreaker, CircuitOpenError, RateLimiter
+from ..utils.executor import executor_manager
+from ..utils.http_session import session_manager
+from ..utils.metrics import metrics
 
 
-@async_retry(max_attempts=3, base_delay=2.0, exceptions=(Exception,))
-async def recognize_song(audio_file_path: str) -> Optional[Dict[str, Any]]:
-    try:
-        shazam = Shazam()
-        result = await shazam.recognize(audio_file_path)
+NETWORK_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, FailedDecodeJson)
+
+# Shared by every Shazam call so retries spend the same budget as fresh lookups
+shazam_rate_limiter = RateLimiter(SHAZAM_REQUESTS_PER_MINUTE, burst=SHAZAM_BURST)
+shazam_breaker = CircuitBreaker('shazam', CIRCUIT_BREAKER_FAILURES, CIRCUIT_BREAKER_RESET_SECONDS)
+
+
+def _parse_track(result: Optional[Dict[str, Any]]) -> Optional[SongRecord]:
+    if result and 'track' in result:
+        track = result['track']
         
-        if result and 'track' in result:
-            track = result['track']
-            
-            song_info = {
-                'title': track.get('title', 'Unknown'),
-                'artist': track.get('subtitle', 'Unknown'),
-                'shazam_count': track.get('shazam_count', 0),
-            }
+        sections = track.get('sections', [])
+        if sections:
+            metadata = sections[0].get('metadata', [])
+            album = metadata[0].get('text', 'Unknown') if len(metadata) > 0 else 'Unknown'
+            release_date = metadata[2].get('text', 'Unknown') if len(metadata) > 2 else 'Unknown'
+        else:
+            album = 'Unknown'
+            release_date = 'Unknown'
+        
+        genres = track.get('genres', {}).get('primary', 'Unknown') if isinstance(track.get('genres'), dict) else 'Unknown'
+        
+        # id and detected_at are filled in by SongHistory.add
+        return SongRecord(
+            None,
+            track.get('title', 'Unknown'),
+            track.get('subtitle', 'Unknown'),
+            album,
+            release_date,
+            genres,
+            track.get('shazam_count', 0)
+        )
+    
+    return None
+
+
+def _pcm_to_wav_bytes(pcm: Union[bytes, memoryview], channels: int, rate: int) -> bytes:
+    """Wrap raw int16 PCM in an in-memory WAV container for the signature generator."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(pcm)
+    return buffer.getvalue()
+
+
+class CompactSignature:
+    """The three values a Shazam search request needs from a signature.
+    
+    Small and picklable, so it is what travels back from the worker process.
+    shazamio reads `sig.signature.uri`, hence the self-returning `signature`.
+    """
+    
+    __slots__ = ('uri', 'samples', 'timestamp')
+    
+    def __init__(self, uri: str, samples: int, timestamp: int):
+        self.uri = uri
+        self.samples = samples
+        self.timestamp = timestamp
+    
+    @property
+    def signature(self) -> 'CompactSignature':
+        return self
+
+
+def generate_signature(wav: bytes) -> CompactSignature:
+    """FFT + peak picking for one window. Runs in the process pool."""
+    async def _generate():
+        return await Recognizer(segment_duration_seconds=RECORD_SECONDS).recognize_bytes(wav)
+    
+    signature = asyncio.run(_generate())
+    return CompactSignature(signature.signature.uri, signature.signature.samples, signature.timestamp)
+
+
+class PooledHTTPClient(HTTPClientInterface):
+    """shazamio HTTP client that sends every request over one keep-alive session.
+    
+    shazamio's default client opens a fresh RetryClient (and TCP/TLS connection)
+    per request; this one reuses warm connections and records latency.
+    """
+    
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_created)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reused)
+        self._trace_configs = [trace_config]
+    
+    async def _on_connection_created(self, session, context, params):
+        metrics.increment('shazam_connections_opened')
+    
+    async def _on_connection_reused(self, session, context, params):
+        metrics.increment('shazam_connections_reused')
+    
+    def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = session_manager.create_session(trace_configs=self._trace_configs)
+        return self._session
+    
+    async def request(self, method: str, url: str, *args, **kwargs) -> Union[List[Any], Dict[str, Any]]:
+        if method.upper() not in ('GET', 'POST'):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        
+        started = time.perf_counter()
+        async with self.get_session().request(method.upper(), url, **kwargs) as response:
+            # Throttling and server errors must reach the retry/breaker logic as failures
+            if response.status == 429 or response.status >= 500:
+                response.raise_for_status()
+            result = await validate_json(response, *args)
+        metrics.record('shazam_request_ms', (time.perf_counter() - started) * 1000)
+        return result
+    
+    async def close(self):
+        if self._session and not self._session.closed:
+            try:
+                await asyncio.wait_for(self._session.close(), timeout=0.1)
+            except asyncio.TimeoutError:
+                log("Shazam session close timeout", "WARNING")
+            except Exception as e:
+                log(f"Shazam session close error: {e}", "WARNING")
+        self._session = None
+
+
+class RecognitionDeferred(Exception):
+    """Shazam could not be reached; the signature was kept in the offline backlog."""
+
+
+class ShazamRecognizer:
+    """Long-lived Shazam client; create once and close on shutdown."""
+    
+    WARM_UP_URL = "https://amp.shazam.com/"
+    
+    def __init__(self, cache: Optional[RecognitionCache] = None):
+        self.http_client = PooledHTTPClient()
+        self.shazam = Shazam(http_client=self.http_client)
+        self.backlog = RecognitionBacklog()
+        self.cache = cache
+    
+    async def warm_up(self) -> bool:
+        """Open a connection to Shazam ahead of the first lookup. Being offline is not fatal."""
+        try:
+            async with self.http_client.get_session().head(self.WARM_UP_URL) as response:
+                await response.release()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log(f"Shazam warm-up failed: {e}", "WARNING")
+        return True
+    
+    async def recognize_pcm(self, pcm: Union[bytes, memoryview], channels: int, rate: int = RATE,
+                            detected_at: Optional[str] = None) -> Optional[SongRecord]:
+        """Recognize normalized int16 PCM straight from memory, without touching disk.
+        
+        The signature is computed off the event loop in a worker process; only the
+        compact signature comes back and is sent to Shazam from here, unless the
+        recognition cache already knows it. If Shazam is unreachable, the signature
+        goes to the backlog and RecognitionDeferred is raised.
+        """
+        try:
+            started = time.perf_counter()
+            wav = _pcm_to_wav_bytes(pcm, channels, rate)
+            signature = await executor_manager.run_in_process(generate_signature, wav)
+            metrics.record('signature_ms', (time.perf_counter() - started) * 1000)
             
-            sections = track.get('sections', [])
-            if sections:
-                metadata = sections[0].get('metadata', [])
-                song_info['album'] = metadata[0].get('text', 'Unknown') if len(metadata) > 0 else 'Unknown'
-                song_info['release_date'] = metadata[2].get('text', 'Unknown') if len(metadata) > 2 else 'Unknown'
-            else:
-                song_info['album'] = 'Unknown'
-                song_info['release_date'] = 'Unknown'
+            # A repeat play resolves from the cache without any network lookup
+            if self.cache is not None:
+                song = self.cache.get(signature.uri)
+                if song:
+                    return song
             
-            song_info['genres'] = track.get('genres', {}).get('primary', 'Unknown') if isinstance(track.get('genres'), dict) else 'Unknown'
+            try:
+                result = await self._send_signature(signature)
+            except (CircuitOpenError,) + NETWORK_ERRORS as e:
+                self.backlog.add(signature.uri, signature.samples, signature.timestamp,
+                                 detected_at or datetime.now().isoformat())
+                raise RecognitionDeferred(str(e)) from e
             
-            return song_info
+            metrics.record('recognize_ms', (time.perf_counter() - started) * 1000)
+            song = _parse_track(result)
+            if song and self.cache is not None:
+                self.cache.put(signature.uri, song)
+            return song
         
-        return None
+        except (asyncio.CancelledError, RecognitionDeferred):
+            raise
+        except Exception as e:
+            log(f"Recognition error: {e}", "ERROR")
+            return None
+    
+    async def resolve_deferred(self, entry: Dict[str, Any]) -> Optional[SongRecord]:
+        """Send a backlog entry; raises RecognitionDeferred while Shazam is still unreachable."""
+        signature = CompactSignature(entry['uri'], entry['samples'], entry['timestamp'])
+        try:
+            song = _parse_track(await self._send_signature(signature))
+            if song and self.cache is not None:
+                self.cache.put(signature.uri, song)
+            return song
+        except (CircuitOpenError,) + NETWORK_ERRORS as e:
+            raise RecognitionDeferred(str(e)) from e
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log(f"Recognition error: {e}", "ERROR")
+            return None
+    
+    @async_retry(max_attempts=3, base_delay=2.0, exceptions=NETWORK_ERRORS,
+                 rate_limiter=shazam_rate_limiter, circuit_breaker=shazam_breaker)
+    async def _send_signature(self, signature: CompactSignature) -> Dict[str, Any]:
+        return await self.shazam.send_recognize_request_v2(signature)
+    
+    @async_retry(max_attempts=3, base_delay=2.0, exceptions=(Exception,), rate_limiter=shazam_rate_limiter)
+    async def recognize_file(self, audio_file_path: str) -> Optional[SongRecord]:
+        try:
+            result = await self.shazam.recognize(audio_file_path)
+            return _parse_track(result)
         
-    except asyncio.CancelledError:
-        raise
-    except Exception as e:
-        log(f"Recognition error: {e}", "ERROR")
-        return None
-    finally:
-        task = asyncio.create_task(_cleanup_audio_file(audio_file_path))
-        task.add_done_callback(lambda t: _handle_cleanup_exception(t, audio_file_path))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log(f"Recognition error: {e}", "ERROR")
+            return None
+        finally:
+            task = asyncio.create_task(_cleanup_audio_file(audio_file_path))
+            task.add_done_callback(lambda t: _handle_cleanup_exception(t, audio_file_path))
+    
+    async def close(self):
+        await asyncio.gather(self.http_client.close(), self.backlog.cleanup())
 
 
 def _handle_cleanup_exception(task: asyncio.Task, file_path: str):
@@ -68,7 +277,7 @@ async def _cleanup_audio_file(audio_file_path: str) -> None:
             if os.path.exists(audio_file_path):
                 os.unlink(audio_file_path)
                 return
-                
+        
         except asyncio.CancelledError:
             raise
         except PermissionError:
@@ -79,12 +288,3 @@ async def _cleanup_audio_file(audio_file_path: str) -> None:
         except Exception as e:
             log(f"Warning: Could not delete temp file {audio_file_path}: {e}", "WARNING")
             break
-
-
-async def test_shazam() -> bool:
-    try:
-        shazam = Shazam()
-        return True
-    except Exception as e:
-        log(f"Shazam test failed: {e}", "ERROR")
-        return False
@@ -0,0 +1,105 @@
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from ..utils.text import normalize_text
+
+
+# Longer query words are looked up by this prefix, then confirmed against the text
+MAX_PREFIX = 6
+# search_newest() reads at most this many candidate ids from the smallest posting per query
+MAX_SCAN = 2000
+
+
+def _prefixes(text: str) -> Set[str]:
+    return {word[:n] for word in text.split() for n in range(1, min(len(word), MAX_PREFIX) + 1)}
+
+
+class SearchIndex:
+    """Word-prefix index over the normalized title, artist and album of each song.
+    
+    Every query word must start some word of the song ("bey hal" finds
+    "Halo - Beyoncé"). Each posting is a dict used as an ordered set: ids are
+    assigned in increasing order, so postings iterate oldest first and results
+    need no sorting, and a removal is a single O(1) delete.
+    """
+    
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, None]] = {}
+        self.texts: Dict[int, str] = {}
+    
+    def __len__(self) -> int:
+        return len(self.texts)
+    
+    def add(self, song_id: int, *fields: str) -> None:
+        text = normalize_text(' '.join(f for f in fields if f and f != 'Unknown'))
+        self.texts[song_id] = f" {text}"
+        for prefix in _prefixes(text):
+            posting = self.postings.get(prefix)
+            if posting is None:
+                self.postings[prefix] = {song_id: None}
+            else:
+                posting[song_id] = None
+    
+    def remove(self, song_id: int) -> None:
+        text = self.texts.pop(song_id, None)
+        if text is None:
+            return
+        
+        for prefix in _prefixes(text):
+            posting = self.postings.get(prefix)
+            if posting is not None:
+                posting.pop(song_id, None)
+                if not posting:
+                    del self.postings[prefix]
+    
+    def _postings(self, words: Set[str]) -> Optional[List[Dict[int, None]]]:
+        """Postings of the query words, smallest first; None if a word matches nothing."""
+        postings = []
+        for word in words:
+            posting = self.postings.get(word[:MAX_PREFIX])
+            if not posting:
+                return None
+            postings.append(posting)
+        postings.sort(key=len)
+        return postings
+    
+    def _matching(self, ids: Iterable[int], words: Set[str], others: List[Dict[int, None]]) -> Iterator[int]:
+        """The ids, taken from the smallest posting, that are in every other posting and contain each long word."""
+        for posting in others:
+            ids = filter(posting.__contains__, ids)
+        texts = self.texts
+        for word in words:
+            if len(word) > MAX_PREFIX:
+                ids = filter(lambda i, needle=f" {word}": needle in texts[i], ids)
+        return ids
+    
+    def search(self, query: str) -> List[int]:
+        """Ids of the songs matching every word of query, oldest first."""
+        words = set(normalize_text(query).split())
+        if not words:
+            return list(self.texts)
+        
+        postings = self._postings(words)
+        if postings is None:
+            return []
+        return list(self._matching(postings[0], words, postings[1:]))
+    
+    def search_newest(self, query: str, limit: int, max_scan: int = MAX_SCAN) -> Tuple[List[int], bool]:
+        """The newest `limit` matches of query, oldest first, and whether there may be more.
+        
+        Only the newest max_scan ids of the smallest posting are checked, so a
+        keystroke costs the same however common the query words are. Older
+        matches past that are not searched, and the result is reported as
+        incomplete.
+        """
+        words = set(normalize_text(query).split())
+        if not words:
+            return list(islice(reversed(self.texts), limit))[::-1], len(self.texts) > limit
+        
+        postings = self._postings(words)
+        if postings is None:
+            return [], False
+        
+        smallest = postings[0]
+        ids = list(islice(self._matching(islice(reversed(smallest), max_scan), words, postings[1:]), limit))
+        ids.reverse()
+        return ids, len(ids) == limit or len(smallest) > max_scan
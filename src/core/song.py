@@ -0,0 +1,81 @@
+import sys
+from typing import Optional, Dict, Any
+from ..config import DEDUP_POLICY
+from ..utils.text import normalize_text, split_artists, split_featured, strip_version_suffix
+
+
+RECORD_FIELDS = ('id', 'title', 'artist', 'album', 'release_date', 'genres', 'shazam_count', 'detected_at')
+
+# Order matters: the SQLite backend stores the index of the policy its keys were built with
+DEDUP_POLICIES = ("exact", "normalized", "loose")
+
+
+def dedup_key(title: str, artist: str, policy: str = DEDUP_POLICY) -> str:
+    """Key under which two detections count as the same song.
+    
+    "exact" compares title and artist as given. "normalized" ignores case,
+    accents and punctuation, and treats the credit as a set of artists, so
+    "Song (feat. B)" by "A" matches "Song" by "A & B". "loose" also drops
+    version suffixes such as "(Remix)", "[Live]" or "- 2011 Remaster".
+    """
+    title, artist = title or '', artist or ''
+    if policy == "exact":
+        return f"{title}|{artist}"
+    
+    if policy == "loose":
+        title = strip_version_suffix(title)
+    title, featured = split_featured(title)
+    artists = split_artists(artist) | split_artists(featured)
+    return f"{normalize_text(title)}|{'&'.join(sorted(artists))}"
+
+
+def song_key(song: Dict[str, Any]) -> str:
+    return dedup_key(song.get('title', ''), song.get('artist', ''))
+
+
+class SongRecord:
+    """One detected song, shared by reference between recognizer, history and TUI.
+    
+    The dedup key (see dedup_key) is computed once, when the record is created.
+    Artist, album, genre and year repeat across many songs, so they are interned:
+    a long session holds one copy of "Pop" or of an artist's name, not one per detection.
+    """
+    
+    __slots__ = RECORD_FIELDS + ('key',)
+    
+    def __init__(self, id: Optional[int], title: str, artist: str, album: str = 'Unknown', release_date: str = 'Unknown',
+                 genres: str = 'Unknown', shazam_count: int = 0, detected_at: str = ''):
+        # Stored rows may hold NULL for any field (e.g. imported legacy JSON entries)
+        self.id = id
+        self.title = title if title is not None else 'Unknown'
+        self.artist = sys.intern(artist if artist is not None else 'Unknown')
+        self.album = sys.intern(album if album is not None else 'Unknown')
+        self.release_date = sys.intern(release_date if release_date is not None else 'Unknown')
+        self.genres = sys.intern(genres if genres is not None else 'Unknown')
+        self.shazam_count = shazam_count or 0
+        self.detected_at = detected_at or ''
+        self.key = dedup_key(title, artist)
+    
+    @property
+    def time(self) -> str:
+        """Detection time of day (HH:MM:SS), from the ISO detected_at."""
+        return self.detected_at[11:19] if len(self.detected_at) >= 19 else '--:--:--'
+    
+    @classmethod
+    def from_dict(cls, song: Dict[str, Any], id: Optional[int] = None, detected_at: Optional[str] = None) -> 'SongRecord':
+        return cls(
+            id if id is not None else song.get('id'),
+            song.get('title', 'Unknown'),
+            song.get('artist', 'Unknown'),
+            song.get('album', 'Unknown'),
+            song.get('release_date', 'Unknown'),
+            song.get('genres', 'Unknown'),
+            song.get('shazam_count', 0),
+            detected_at or song.get('detected_at') or ''
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in RECORD_FIELDS}
+    
+    def __repr__(self) -> str:
+        return f"SongRecord(id={self.id}, title={self.title!r}, artist={self.artist!r})"
@@ -1,21 +1,24 @@
+import os
 import asyncio
+import signal
 import sys
+import argparse
 from datetime import datetime
-from rich.live import Live
+from typing import Optional, TYPE_CHECKING
 
-from .core.audio import test_microphone
-from .core.recognizer import test_shazam
-from .services.manager import ServiceManager
-from .ui.tui import ShazamTUI
-from .utils.async_loops import audio_recognition_loop, command_processor_loop
+from .ui.keys import ESC_TIMEOUT, KeyParser
 from .utils.logger import log
-from .utils.http_session import session_manager
-from .utils.executor import executor_manager
+from .utils.metrics import metrics
+
+# The TUI, audio and recognition stack is imported in main_async, so that
+# subcommands such as `export` start without loading it
+if TYPE_CHECKING:
+    from rich.live import Live
+    from .ui.tui import ShazamTUI
 
 if sys.platform == 'win32':
     import msvcrt
 else:
-    import select
     import tty
     import termios
 
@@ -26,13 +29,21 @@ class InputHandler:
         self.loop = loop
         self.running = True
         self._thread = None
+        self._parser = KeyParser()
+        self._esc_timer: Optional[asyncio.TimerHandle] = None
+        self._saved_tty = None
         self._setup()
-
+    
     def _setup(self):
         if sys.platform != 'win32':
             # Unix: Zero-cost add_reader
             try:
-                self.loop.add_reader(sys.stdin, self._unix_input_handler)
+                fd = sys.stdin.fileno()
+                if os.isatty(fd):
+                    # cbreak: keys arrive as they are typed, unechoed; Ctrl+C still interrupts
+                    self._saved_tty = termios.tcgetattr(fd)
+                    tty.setcbreak(fd)
+                self.loop.add_reader(fd, self._unix_input_handler)
             except Exception as e:
                 log(f"Warning: Stdout not a TTY, falling back to polling: {e}", "WARNING")
                 asyncio.create_task(self._fallback_polling_loop())
@@ -41,22 +52,35 @@ class InputHandler:
             import threading
             self._thread = threading.Thread(target=self._windows_input_thread, daemon=True)
             self._thread.start()
-
+    
     def _unix_input_handler(self):
+        """Read everything the terminal has buffered in one go and queue the keys it spells."""
+        fd = sys.stdin.fileno()
         try:
-            line = sys.stdin.read(1)
-            if not line:
-                return
-            
-            key = line.lower()
-            if key == '\x1b':
-                # Simple escape sequence handling
-                pass
-            
-            asyncio.create_task(self.queue.put(key.strip()))
-        except Exception:
-            pass
-
+            data = os.read(fd, 4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        
+        if not data:
+            # stdin closed: stop watching it instead of waking on EOF forever
+            self.loop.remove_reader(fd)
+            return
+        
+        if self._esc_timer is not None:
+            self._esc_timer.cancel()
+            self._esc_timer = None
+        for key in self._parser.feed(data):
+            self.queue.put_nowait(key)
+        if self._parser.pending:
+            self._esc_timer = self.loop.call_later(ESC_TIMEOUT, self._flush_escape)
+    
+    def _flush_escape(self):
+        self._esc_timer = None
+        for key in self._parser.flush():
+            self.queue.put_nowait(key)
+    
     def _windows_input_thread(self):
         """Blocking input thread for Windows - Zero CPU usage"""
         while self.running:
@@ -66,15 +90,23 @@ class InputHandler:
                 key = ''
                 
                 if char == b'\x1b':
-                    key = 'q'
+                    key = 'esc'
                 elif char == b'\r':
-                    continue
+                    key = 'enter'
+                elif char == b'\x08':
+                    key = 'backspace'
+                elif char == b' ':
+                    key = 'space'
                 elif char in [b'\x00', b'\xe0']:
                     # Special keys
                     if msvcrt.kbhit():
                         next_char = msvcrt.getch()
                         if next_char == b'H': key = 'up'
                         elif next_char == b'P': key = 'down'
+                        elif next_char == b'I': key = 'pageup'
+                        elif next_char == b'Q': key = 'pagedown'
+                        elif next_char == b'G': key = 'home'
+                        elif next_char == b'O': key = 'end'
                 else:
                     try:
                         key = char.decode('utf-8').lower()
@@ -84,51 +116,55 @@ class InputHandler:
                 if key and self.running:
                     # Thread-safe way to put into asyncio queue
                     self.loop.call_soon_threadsafe(self.queue.put_nowait, key)
-                    
+            
             except Exception as e:
                 # Don't log here to avoid thread conflicts, just retry
                 pass
-
+    
     async def _fallback_polling_loop(self):
         """For non-TTY Unix environments"""
         import select
         while self.running:
             await asyncio.sleep(0.1)
-
+    
     def stop(self):
         self.running = False
         if sys.platform != 'win32':
+            if self._esc_timer is not None:
+                self._esc_timer.cancel()
             try:
-                self.loop.remove_reader(sys.stdin)
+                self.loop.remove_reader(sys.stdin.fileno())
             except:
                 pass
+            if self._saved_tty is not None:
+                termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, self._saved_tty)
         # Windows thread is daemon, will die with process
 
 
-async def update_display(live: Live, tui: ShazamTUI):
-    """Ultra-smooth display update with adaptive rendering"""
-    last_render_time = 0
-    min_render_interval = 0.033  # 30Hz for smooth motion
+async def update_display(live: 'Live', tui: 'ShazamTUI', min_interval: float = 1 / 30):
+    """Draw a frame when the TUI changes, at most one per min_interval.
+    
+    Sleeps on the TUI's render event, so an idle screen costs no wakeups. A
+    burst of changes (e.g. a held arrow key) is folded into the next frame.
+    """
+    loop = asyncio.get_running_loop()
+    wake = tui.render_event()
+    last_frame = -min_interval
     
     while True:
         try:
-            import time
-            current_time = time.time()
-            
-            if tui.needs_render():
-                # Immediate render for navigation, throttled for other updates
-                if tui._force_render:
-                    live.update(tui.render())
-                    tui.mark_rendered()
-                    last_render_time = current_time
-                elif (current_time - last_render_time) >= min_render_interval:
-                    live.update(tui.render())
-                    tui.mark_rendered()
-                    last_render_time = current_time
-            
-            # 20Hz check rate is sufficient for TUI
-            await asyncio.sleep(0.05)
+            await wake.wait()
+            delay = last_frame + min_interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            wake.clear()
             
+            started = loop.time()
+            live.update(tui.render(), refresh=True)
+            tui.mark_rendered()
+            last_frame = loop.time()
+            metrics.record('frame_ms', (last_frame - started) * 1000)
+        
         except asyncio.CancelledError:
             break
         except KeyboardInterrupt:
@@ -139,47 +175,39 @@ async def update_display(live: Live, tui: ShazamTUI):
 
 
 async def main_async() -> None:
-    mic_ok, shazam_ok = await asyncio.gather(
+    from rich.live import Live
+    from .core.audio import test_microphone
+    from .services.manager import ServiceManager
+    from .ui.tui import ShazamTUI
+    from .utils.async_loops import audio_recognition_loop, command_processor_loop
+    from .utils.http_session import session_manager
+    from .utils.executor import executor_manager
+    
+    services = ServiceManager()
+    
+    mic_ok, shazam_ok, _ = await asyncio.gather(
         test_microphone(),
-        test_shazam()
+        services.recognizer.warm_up(),
+        executor_manager.warm_up()
     )
     
     if not mic_ok or not shazam_ok:
         log("[!] System check failed!", "ERROR")
+        await services.cleanup()
         return
-    
-    services = ServiceManager()
-    tui = ShazamTUI()
-    
-    for song in services.history.songs:
-        if 'title_display' not in song:
-            song['title_display'] = song.get('title', 'Unknown')[:30]
-            song['artist_display'] = song.get('artist', 'Unknown')[:25]
-            song['genre_display'] = song.get('genres', 'Unknown')[:12]
-        if 'time' not in song:
-            detected_at = song.get('detected_at', '')
-            if detected_at:
-                try:
-                    dt = datetime.fromisoformat(detected_at)
-                    song['time'] = dt.strftime("%H:%M:%S")
-                except Exception:
-                    song['time'] = '--:--:--'
-            else:
-                song['time'] = '--:--:--'
-        tui.add_song(song, auto_scroll=False)
-    
-    if tui.songs:
-        tui.selected_index = len(tui.songs) - 1
-        tui._update_scroll()
+    # The TUI lists the history window itself and follows it as an observer
+    tui = ShazamTUI(services.history)
     
     command_queue = asyncio.Queue()
     
     loop = asyncio.get_event_loop()
     
-    # 30Hz for ultra-smooth navigation (33ms refresh)
-    # High enough for smooth motion, low enough to prevent flicker
-    with Live(tui.render(), refresh_per_second=30, screen=True) as live:
+    # No auto-refresh: update_display draws a frame only when something changed
+    with Live(tui.render(), auto_refresh=False, screen=True) as live:
         tui.live = live
+        if hasattr(signal, 'SIGWINCH'):
+            # Redraw at the new size when the terminal is resized
+            loop.add_signal_handler(signal.SIGWINCH, tui.invalidate, True)
         
         # Input handling (No separate task needed for Unix, Task created inside for Win)
         input_handler = InputHandler(command_queue, loop)
@@ -219,7 +247,41 @@ async def main_async() -> None:
                 pass
 
 
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m src.main", description="Identify songs playing around you.")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    
+    stats = commands.add_parser("stats", help="print listening statistics from the song history and exit")
+    stats.add_argument("--by", choices=("hour", "day", "week"), default="day", help="time bucket for the breakdowns (default: day)")
+    stats.add_argument("--top", type=int, default=10, help="how many artists and genres to list (default: 10)")
+    stats.add_argument("--since", type=datetime.fromisoformat, metavar="DATE",
+                       help="only count detections from this date on, e.g. 2025-01-31")
+    stats.add_argument("--buckets", type=int, default=14, help="show only the most recent buckets; 0 for all (default: 14)")
+    
+    export = commands.add_parser("export", help="write the song history as CSV, JSON Lines or Parquet and exit")
+    export.add_argument("-o", "--output", metavar="FILE",
+                        help="file to write; format follows its extension (default: stdout)")
+    export.add_argument("-f", "--format", choices=("csv", "jsonl", "parquet"),
+                        help="output format (default: from the file extension, else csv)")
+    export.add_argument("--since", type=datetime.fromisoformat, metavar="DATE",
+                        help="only songs detected from this date on, e.g. 2025-01-01")
+    export.add_argument("--until", type=datetime.fromisoformat, metavar="DATE",
+                        help="only songs detected before this date, e.g. 2025-02-01")
+    export.add_argument("--artist", help="only songs whose artist contains this text (ignoring case and accents)")
+    export.add_argument("--chunk-size", type=int, default=1000, help="songs read and written per chunk (default: 1000)")
+    
+    return parser.parse_args(argv)
+
+
 def main() -> None:
+    args = parse_args()
+    if args.command == "stats":
+        from .ui.cli import run_stats
+        sys.exit(run_stats(args))
+    if args.command == "export":
+        from .ui.cli import run_export
+        sys.exit(run_export(args))
+    
     if sys.platform == 'win32':
         asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
     
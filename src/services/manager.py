@@ -1,4 +1,8 @@
+import asyncio
+from ..config import RECOGNITION_CACHE
 from ..core.history import SongHistory
+from ..core.recognizer import ShazamRecognizer
+from ..core.recognition_cache import RecognitionCache
 from .downloader import MusicDownloader
 from .youtube import YouTubePlayer
 from .voice import VoiceController
@@ -8,9 +12,15 @@ class ServiceManager:
     
     def __init__(self):
         self.history = SongHistory()
+        self.recognition_cache = RecognitionCache()
+        self.recognizer = ShazamRecognizer(self.recognition_cache if RECOGNITION_CACHE else None)
         self.downloader = MusicDownloader()
         self.player = YouTubePlayer()
         self.voice_controller = VoiceController()
     
     async def cleanup(self):
-        await self.history.cleanup()
+        await asyncio.gather(
+            self.history.cleanup(),
+            self.recognizer.close(),
+            self.recognition_cache.cleanup()
+        )
@@ -0,0 +1,57 @@
+import sys
+import asyncio
+import argparse
+from pathlib import Path
+from ..core.history import SongHistory
+
+# Subcommands import what they need themselves, so that e.g. `export` never loads numpy or rich
+
+
+def run_stats(args: argparse.Namespace) -> int:
+    """`stats` subcommand: print listening statistics over the full stored history."""
+    from rich.console import Console
+    from ..core.analytics import HistoryAnalytics
+    from .stats_view import make_stats_view
+    
+    history = SongHistory()
+    try:
+        analytics = HistoryAnalytics.from_songs(history.iter_songs())
+        Console().print(make_stats_view(
+            analytics,
+            period=args.by,
+            top=args.top,
+            since=args.since,
+            buckets=args.buckets or None,
+            per_bucket=True
+        ))
+    finally:
+        asyncio.run(history.cleanup())
+    return 0
+
+
+def run_export(args: argparse.Namespace) -> int:
+    """`export` subcommand: stream the full stored history to a file or stdout."""
+    from ..core.export import EXPORT_FORMATS, ExportError, export_songs, filter_songs
+    
+    path = None if args.output in (None, '-') else args.output
+    fmt = args.format
+    if fmt is None:
+        suffix = Path(path).suffix.lstrip('.').lower() if path else ''
+        fmt = suffix if suffix in EXPORT_FORMATS else 'csv'
+    
+    history = SongHistory()
+    try:
+        songs = filter_songs(history.iter_songs(args.chunk_size), since=args.since, until=args.until, artist=args.artist)
+        if path is None or fmt == 'parquet':
+            written = export_songs(songs, fmt, out=sys.stdout, path=path, chunk_size=args.chunk_size)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                written = export_songs(songs, fmt, out=f, chunk_size=args.chunk_size)
+    except (ExportError, OSError) as e:
+        print(f"❌ Export failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        asyncio.run(history.cleanup())
+    
+    print(f"Exported {written:,} songs to {path or 'stdout'} ({fmt})", file=sys.stderr)
+    return 0
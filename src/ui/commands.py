@@ -36,25 +36,47 @@ async def process_command(
     tui: 'ShazamTUI',
     voice_controller: Optional[VoiceController] = None
 ) -> Optional[str]:
-    cmd = command.strip().lower()
-    
-    if not cmd:
-        return None
-    
-    if cmd == 'up':
+    # Navigation keys work in every mode, even while a filter or id is being typed
+    if command == 'up':
         tui.scroll_up()
         return None
-    elif cmd == 'down':
+    elif command == 'down':
         tui.scroll_down()
         return None
+    elif command == 'pageup':
+        tui.page_up()
+        return None
+    elif command == 'pagedown':
+        tui.page_down()
+        return None
+    elif command == 'home':
+        tui.scroll_home()
+        return None
+    elif command == 'end':
+        tui.scroll_end()
+        return None
+    
+    # While the '/' filter or a 'g' song id is being typed, every key belongs to it
+    if tui.filter_editing:
+        tui.filter_key(command)
+        return None
+    if tui.jump_query is not None:
+        tui.jump_key(command)
+        return None
+    
+    cmd = command.strip().lower()
+    
+    # Named keys only mean something to the filter
+    if not cmd or cmd in ('enter', 'space', 'backspace'):
+        return None
     
     try:
         if cmd == 'd':
             song = tui.get_selected_song()
             
             if song:
-                tui.set_status(f"[DL] Downloading: {song['title'][:30]}...")
-                task = asyncio.create_task(downloader.download_from_jiosaavn(song['title'], song['artist']))
+                tui.set_status(f"[DL] Downloading: {song.title[:30]}...")
+                task = asyncio.create_task(downloader.download_from_jiosaavn(song.title, song.artist))
                 task.add_done_callback(lambda t: _handle_task_exception(t, "Download"))
                 tui.add_task(task)
             else:
@@ -64,8 +86,8 @@ async def process_command(
             song = tui.get_selected_song()
             
             if song:
-                tui.set_status(f"[YT] Playing: {song['title'][:30]}...")
-                task = asyncio.create_task(player.play_song(song['title'], song['artist']))
+                tui.set_status(f"[YT] Playing: {song.title[:30]}...")
+                task = asyncio.create_task(player.play_song(song.title, song.artist))
                 task.add_done_callback(lambda t: _handle_task_exception(t, "YouTube"))
                 tui.add_task(task)
             else:
@@ -82,14 +104,25 @@ async def process_command(
         
         elif cmd == '?':
             tui.toggle_help()
+        
+        elif cmd == '/':
+            tui.start_filter()
+        
+        elif cmd == 'g':
+            tui.start_jump()
+        
+        elif cmd == 's':
+            tui.toggle_stats()
+        
+        elif cmd in ('esc', '\x1b'):
+            # Esc only leaves the filter; quitting is 'q' alone
+            if tui.filter_query is not None:
+                tui.clear_filter()
 
         elif cmd == 'x':
-            song = tui.get_selected_song()
-            if song:
-                history.remove(song['id'])
-                removed = tui.remove_selected_song()
-                if removed:
-                    tui.set_status(f"[X] Removed: {removed['title'][:20]}")
+            removed = tui.remove_selected_song()
+            if removed:
+                tui.set_status(f"[X] Removed: {removed.title[:20]}")
             else:
                 tui.set_status("[!] No song selected")
         
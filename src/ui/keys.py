@@ -0,0 +1,96 @@
+import codecs
+from typing import List
+
+
+# Seconds to wait after a lone ESC byte before deciding it was the Esc key, not the start of a sequence
+ESC_TIMEOUT = 0.05
+
+# Keys that would otherwise be lost to strip() or unreadable as single characters
+KEY_NAMES = {'\r': 'enter', '\n': 'enter', ' ': 'space', '\x7f': 'backspace', '\x08': 'backspace'}
+
+# Final byte of CSI ("\x1b[A") and SS3 ("\x1bOA") cursor key sequences; modifiers ("\x1b[1;5A") are ignored
+FINAL_KEYS = {'A': 'up', 'B': 'down', 'C': 'right', 'D': 'left', 'H': 'home', 'F': 'end'}
+
+# Number in "\x1b[<n>~" sequences (vt220/xterm; 7 and 8 are rxvt's Home and End)
+TILDE_KEYS = {'1': 'home', '2': 'insert', '3': 'delete', '4': 'end', '5': 'pageup', '6': 'pagedown', '7': 'home', '8': 'end'}
+
+
+class KeyParser:
+    """Turns raw terminal input into key names: 'up', 'pageup', 'esc', 'enter', 'a', ...
+    
+    Reads may split a sequence (or a UTF-8 character) anywhere, so an
+    unfinished one is held until the next feed(). A lone ESC looks like the
+    start of a sequence; if nothing follows within ESC_TIMEOUT the caller
+    calls flush() and it becomes 'esc'. A sequence whose ESC was flushed that
+    way (its bytes arrived late, as over a slow SSH link) is still read as a
+    sequence. Unknown sequences are dropped whole instead of leaking their
+    bytes as letters.
+    """
+    
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._pending = ''
+        # A lone ESC was just flushed as 'esc'; the rest of its sequence may still arrive
+        self._flushed_esc = False
+    
+    @property
+    def pending(self) -> bool:
+        return bool(self._pending)
+    
+    def feed(self, data: bytes) -> List[str]:
+        text = self._pending + self._decoder.decode(data)
+        self._pending = ''
+        if self._flushed_esc and text[:1] in ('[', 'O'):
+            text = '\x1b' + text
+        self._flushed_esc = False
+        keys = []
+        i, end = 0, len(text)
+        
+        while i < end:
+            char = text[i]
+            if char != '\x1b':
+                key = KEY_NAMES.get(char)
+                if key is None and char.isprintable():
+                    key = char.lower()
+                if key:
+                    keys.append(key)
+                i += 1
+                continue
+            
+            if i + 1 == end:
+                self._pending = text[i:]
+                break
+            
+            intro = text[i + 1]
+            if intro == '[':
+                # Parameter and intermediate bytes run up to a final byte in @..~
+                j = i + 2
+                while j < end and not '@' <= text[j] <= '~':
+                    j += 1
+                if j == end:
+                    self._pending = text[i:]
+                    break
+                params = text[i + 2:j]
+                key = TILDE_KEYS.get(params.split(';')[0]) if text[j] == '~' else FINAL_KEYS.get(text[j])
+                i = j + 1
+            elif intro == 'O':
+                if i + 2 == end:
+                    self._pending = text[i:]
+                    break
+                key = FINAL_KEYS.get(text[i + 2])
+                i += 3
+            else:
+                # Alt+key (ESC then an ordinary key): just the key, on the next pass
+                key = None
+                i += 1
+            
+            if key:
+                keys.append(key)
+        
+        return keys
+    
+    def flush(self) -> List[str]:
+        """Resolve held input after ESC_TIMEOUT: a lone ESC was the Esc key, a cut-off sequence is dropped."""
+        pending, self._pending = self._pending, ''
+        self._flushed_esc = pending == '\x1b'
+        return ['esc'] if self._flushed_esc else []
@@ -0,0 +1,113 @@
+from typing import Dict, List, Optional, Tuple
+from rich.cells import cell_len, set_cell_size
+from rich.console import Console, ConsoleOptions, RenderResult
+from rich.segment import Segment
+from rich.style import Style
+from ..core.song import SongRecord
+
+
+GAP = "  "
+MARKER_WIDTH, ID_WIDTH, TIME_WIDTH = 2, 5, 10
+# Widest the title, artist and info columns get; narrower terminals shrink them in proportion
+FLEX_WIDTHS = (32, 26, 20)
+
+HEADER_STYLE = Style.parse("bold cyan")
+ID_STYLE = Style.parse("bold green")
+TIME_STYLE = Style.parse("dim")
+TITLE_STYLE = Style.parse("bold white")
+ARTIST_STYLE = Style.parse("magenta")
+INFO_STYLE = Style.parse("dim")
+SELECTED_STYLE = Style.parse("on blue")
+
+
+def _fit(text: str, width: int) -> str:
+    """text padded or cut (with "...") to exactly `width` terminal cells."""
+    if cell_len(text) <= width:
+        return set_cell_size(text, width)
+    return set_cell_size(text, max(0, width - 3)) + "..."[:width]
+
+
+def _column_widths(width: int) -> Tuple[int, ...]:
+    available = width - MARKER_WIDTH - ID_WIDTH - TIME_WIDTH - len(GAP) * 5
+    if available >= sum(FLEX_WIDTHS):
+        flex = FLEX_WIDTHS
+    else:
+        flex = tuple(max(3, available * w // sum(FLEX_WIDTHS)) for w in FLEX_WIDTHS)
+    return (MARKER_WIDTH, ID_WIDTH, TIME_WIDTH) + flex
+
+
+class RowCache:
+    """Rendered song rows as Rich segments, keyed by song id and selection, for one terminal width.
+    
+    A row is built once; moving the cursor only restyles the row it leaves
+    and the row it lands on, and every other visible row is a dict lookup.
+    A width change (terminal resize) drops the cache.
+    """
+    
+    def __init__(self, limit: int = 2048):
+        self.limit = limit
+        self.width: Optional[int] = None
+        self.widths: Tuple[int, ...] = ()
+        self.lines: Dict[Tuple[int, bool], List[Segment]] = {}
+        self._header: List[Segment] = []
+    
+    def _resize(self, width: int) -> None:
+        self.width = width
+        self.widths = _column_widths(width)
+        self.lines.clear()
+        self._header = self._line(("", "ID", "Time", "Song", "Artist", "Info"), [HEADER_STYLE] * 6)
+    
+    def _line(self, cells: Tuple[str, ...], styles: List[Style]) -> List[Segment]:
+        line = []
+        for i, (text, width, style) in enumerate(zip(cells, self.widths, styles)):
+            if i:
+                line.append(Segment(GAP))
+            line.append(Segment(_fit(text, width), style))
+        line.append(Segment.line())
+        return line
+    
+    def header(self, width: int) -> List[Segment]:
+        if width != self.width:
+            self._resize(width)
+        return self._header
+    
+    def row(self, song: SongRecord, width: int, selected: bool = False) -> List[Segment]:
+        if width != self.width:
+            self._resize(width)
+        key = (song.id, selected)
+        line = self.lines.get(key)
+        if line is not None:
+            return line
+        
+        if selected:
+            plain = self.row(song, width)
+            marker = Segment(_fit(">", MARKER_WIDTH))
+            line = list(Segment.apply_style([marker] + plain[1:-1], post_style=SELECTED_STYLE)) + [plain[-1]]
+        else:
+            info = f"{song.genres if len(song.genres) <= 12 else song.genres[:9] + '...'}, {song.release_date}"
+            line = self._line(
+                ("", f"#{song.id or 0:03d}", song.time, song.title, song.artist, info),
+                [Style.null(), ID_STYLE, TIME_STYLE, TITLE_STYLE, ARTIST_STYLE, INFO_STYLE]
+            )
+        
+        if len(self.lines) >= self.limit:
+            self.lines.clear()
+        self.lines[key] = line
+        return line
+
+
+class SongList:
+    """The visible window of the songs list; only these rows are ever rendered."""
+    
+    __slots__ = ('cache', 'songs', 'selected')
+    
+    def __init__(self, cache: RowCache, songs: List[SongRecord], selected: int):
+        self.cache = cache
+        self.songs = songs
+        self.selected = selected
+    
+    def __rich_console__(self, console: Console, options: ConsoleOptions) -> RenderResult:
+        width = options.max_width
+        yield from self.cache.header(width)
+        for index, song in enumerate(self.songs):
+            yield from self.cache.row(song, width, index == self.selected)
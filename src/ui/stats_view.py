@@ -0,0 +1,104 @@
+from datetime import datetime
+from typing import Optional, Dict, Any
+from rich.console import Group
+from rich.table import Table
+from rich.text import Text
+from rich.columns import Columns
+from ..core.analytics import HistoryAnalytics
+
+
+BAR_WIDTH = 24
+
+_BUCKET_FORMATS = {'hour': "%Y-%m-%d %H:00", 'day': "%Y-%m-%d %a", 'week': "week of %Y-%m-%d"}
+
+
+def _top_table(title: str, rows) -> Table:
+    table = Table(title=title, title_style="bold cyan", box=None, padding=(0, 1), show_header=False)
+    table.add_column("Name", style="magenta", no_wrap=True, max_width=28)
+    table.add_column("Count", style="green", justify="right")
+    for name, count in rows:
+        table.add_row(name, str(count))
+    return table
+
+
+def make_metrics_view(snapshot: Dict[str, Any]) -> Table:
+    """This session's audio and Shazam measurements from a metrics.snapshot(), for the TUI stats panel."""
+    counters, timings = snapshot['counters'], snapshot['timings']
+    table = Table(title="This session", title_style="bold cyan", box=None, padding=(0, 1), show_header=False)
+    table.add_column("Measure", style="dim", no_wrap=True)
+    table.add_column("Value", style="green", no_wrap=True)
+    
+    raw, compact = timings.get('window_bytes_raw'), timings.get('window_bytes_compact')
+    if raw and compact:
+        table.add_row("Window sent", f"{compact['avg'] / 1024:,.0f} KB (from {raw['avg'] / 1024:,.0f} KB captured)")
+    downsample = timings.get('downsample_cpu_ms')
+    if downsample:
+        table.add_row("Downsample CPU", f"{downsample['avg']:.1f} ms avg, {downsample['max']:.1f} ms max")
+    
+    request = timings.get('shazam_request_ms')
+    if request:
+        table.add_row("Shazam request", f"{request['avg']:,.0f} ms avg, {request['last']:,.0f} ms last")
+    opened, reused = counters.get('shazam_connections_opened', 0), counters.get('shazam_connections_reused', 0)
+    if opened or reused:
+        table.add_row("Shazam connections", f"{opened} opened, {reused} reused")
+    
+    if not table.rows:
+        table.add_row("No measurements yet", "")
+    return table
+
+
+def make_stats_view(analytics: HistoryAnalytics, period: str = 'day', top: int = 5,
+                    since: Optional[datetime] = None, buckets: Optional[int] = 14, per_bucket: bool = False) -> Group:
+    """Listening statistics as rich renderables, shared by the TUI stats panel and the `stats` command.
+    
+    Only the last `buckets` periods are listed (None lists all of them).
+    """
+    summary = analytics.summary(since)
+    if not summary['detections']:
+        return Group(Text("No detections to analyse yet.", style="dim"))
+    
+    header = Text()
+    header.append(f"{summary['detections']:,}", style="bold green")
+    header.append(" detections  ", style="dim")
+    header.append(f"{summary['songs']:,}", style="bold green")
+    header.append(" songs  ", style="dim")
+    header.append(f"{summary['artists']:,}", style="bold green")
+    header.append(" artists  ", style="dim")
+    header.append(f"{summary['repeat_rate']:.0%}", style="bold green")
+    header.append(" repeats  ", style="dim")
+    header.append(f"{summary['first']:%Y-%m-%d} to {summary['last']:%Y-%m-%d}", style="dim")
+    
+    bucket_format = _BUCKET_FORMATS[period]
+    detections = analytics.detections(period, since, last=buckets)
+    repeat_rates = dict(analytics.repeat_rates(period, since, last=buckets))
+    
+    peak = max(count for _, count in detections)
+    timeline = Table(title=f"Detections per {period}", title_style="bold cyan", box=None, padding=(0, 1))
+    timeline.add_column("When", style="dim", no_wrap=True)
+    timeline.add_column("", style="cyan", no_wrap=True)
+    timeline.add_column("Count", style="green", justify="right")
+    timeline.add_column("Repeats", style="dim", justify="right")
+    for start, count in detections:
+        bar = "█" * max(1, round(count / peak * BAR_WIDTH))
+        timeline.add_row(start.strftime(bucket_format), bar, str(count), f"{repeat_rates[start]:.0%}")
+    
+    parts = [
+        header,
+        Text(""),
+        Columns([
+            _top_table("Top artists", analytics.top('artist', top, since)),
+            _top_table("Top genres", analytics.top('genre', top, since))
+        ], padding=(0, 4)),
+        Text(""),
+        timeline
+    ]
+    
+    if per_bucket:
+        leaders = Table(title=f"Top artists per {period}", title_style="bold cyan", box=None, padding=(0, 1))
+        leaders.add_column("When", style="dim", no_wrap=True)
+        leaders.add_column("Artists", style="magenta")
+        for start, artists in analytics.top_per_bucket('artist', period, 3, since, last=buckets):
+            leaders.add_row(start.strftime(bucket_format), ", ".join(f"{name} ({count})" for name, count in artists))
+        parts += [Text(""), leaders]
+    
+    return Group(*parts)
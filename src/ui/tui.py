@@ -1,44 +1,192 @@
-from datetime import datetime
-from typing import Dict, Any, Optional, List, TYPE_CHECKING
-from rich.console import Console
+from typing import Dict, Optional, List, TYPE_CHECKING
+from rich.console import Console, Group
 from rich.layout import Layout
 from rich.panel import Panel
 from rich.table import Table
 from rich.text import Text
+from rich.markup import escape
 from rich.live import Live
 from rich.align import Align
 from rich.columns import Columns
+import time
 import asyncio
 import threading
+from bisect import bisect_left
+from itertools import islice
+from ..core.song import SongRecord
+from ..core.history import SongHistory, HistoryObserver
+from ..core.analytics import HistoryAnalytics
+from .stats_view import make_stats_view, make_metrics_view
+from .song_list import RowCache, SongList
+from ..utils.executor import executor_manager
+from ..utils.logger import log
+from ..utils.metrics import metrics
 
 if TYPE_CHECKING:
     from rich.live import Live as LiveType
 
 
-class ShazamTUI:
+# The '/' filter lists at most this many matches, the newest, so a one-letter query stays instant
+# (the search also bounds how many candidates it checks, see SearchIndex.search_newest)
+FILTER_MATCH_LIMIT = 1000
+
+
+class SongView:
+    """Rows of the songs panel as a list of history ids, oldest first; records are fetched only for the rows shown.
+    
+    Used for the filter's matches; `more` is True when the search stopped
+    before finding every match. Ids are assigned in increasing order, so
+    positions are found by bisection.
+    """
+    
+    __slots__ = ('history', 'ids', 'more')
+    
+    def __init__(self, history: SongHistory, ids: List[int], more: bool = False):
+        self.history = history
+        self.ids = ids
+        self.more = more
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def __getitem__(self, index: slice) -> List[SongRecord]:
+        return self.history.get_many(self.ids[index])
+    
+    def index(self, song_id: int) -> int:
+        """Position of song_id, or -1."""
+        ids = self.ids
+        position = bisect_left(ids, song_id)
+        return position if position < len(ids) and ids[position] == song_id else -1
+    
+    def remove(self, song_id: int) -> int:
+        """Drop song_id and return the position it had, or -1 if it wasn't listed."""
+        position = self.index(song_id)
+        if position != -1:
+            del self.ids[position]
+        return position
+
+
+class HistoryView:
+    """Every stored song as rows of the songs panel, oldest first: older songs from the backend, then the window.
+    
+    Only the history window is in memory, and it is always the newest rows,
+    so the list opens without reading the backend beyond a count. The ids of
+    older songs are read the first time one of their rows is needed, and
+    their records a page at a time for the rows on screen.
+    """
+    
+    __slots__ = ('history', '_older', '_older_count', '_boundary')
     
-    def __init__(self):
+    def __init__(self, history: SongHistory):
+        self.history = history
+        self._older: Optional[List[int]] = None
+        # Every song in the window is stored too
+        self._older_count = max(0, history.backend.count() - len(history.songs_by_id))
+        # Ids below this are older rows, the rest are in the window
+        window = history.songs_by_id
+        self._boundary = next(iter(window)) if window else history.current_index + 1
+    
+    @property
+    def older(self) -> List[int]:
+        """Ids of the stored songs older than the window, read from the backend on first use."""
+        if self._older is None:
+            self._older = self.history.backend.ids_before(self._boundary)
+        return self._older
+    
+    def _older_len(self) -> int:
+        return len(self._older) if self._older is not None else self._older_count
+    
+    def __len__(self) -> int:
+        return self._older_len() + len(self.history.songs_by_id)
+    
+    def __getitem__(self, index: slice) -> List[SongRecord]:
+        start, stop, _ = index.indices(len(self))
+        older_len = self._older_len()
+        ids = self.older[start:stop] if start < older_len else []
+        if stop > older_len:
+            ids += islice(self.history.songs_by_id, max(0, start - older_len), stop - older_len)
+        return self.history.get_many(ids)
+    
+    def index(self, song_id: int) -> int:
+        """Position of song_id, or -1."""
+        window = self.history.songs_by_id
+        if song_id >= self._boundary:
+            if song_id not in window:
+                return -1
+            return self._older_len() + next(i for i, window_id in enumerate(window) if window_id == song_id)
+        older = self.older
+        position = bisect_left(older, song_id)
+        return position if position < len(older) and older[position] == song_id else -1
+    
+    def evict(self, song_id: int) -> None:
+        """song_id aged out of the window: it is now the newest of the older rows, at the same position."""
+        self._boundary = song_id + 1
+        if self._older is not None:
+            self._older.append(song_id)
+        else:
+            self._older_count += 1
+    
+    def remove(self, song_id: int) -> int:
+        """song_id was deleted (and has already left the window); returns the position it had, or -1."""
+        if song_id >= self._boundary:
+            return self._older_len() + sum(1 for window_id in self.history.songs_by_id if window_id < song_id)
+        # If the older ids were never read, reading them now already leaves the deleted song out
+        older = self.older
+        position = bisect_left(older, song_id)
+        if position < len(older) and older[position] == song_id:
+            del older[position]
+            return position
+        return -1
+
+
+class ShazamTUI(HistoryObserver):
+    """Terminal UI; the songs list is a view over the stored history, kept current as the history's observer."""
+    
+    def __init__(self, history: SongHistory):
         self.console = Console()
         self.layout = Layout()
-        self.songs: List[Dict[str, Any]] = []
+        self.history = history
+        self.songs = HistoryView(history)
+        # '/' filter: None when off; while editing, typed keys go to the query
+        self.filter_query: Optional[str] = None
+        self.filter_editing = False
+        self.filtered: Optional[SongView] = None
+        # Indexes the full history for the filter the first time '/' is pressed
+        self._index_task: Optional[asyncio.Task] = None
+        # 'g' jump: the song id typed so far, None when not jumping
+        self.jump_query: Optional[str] = None
+        self.show_stats = False
+        # Built in the background from the full history the first time the stats panel opens, then kept current
+        self.analytics: Optional[HistoryAnalytics] = None
+        self._analytics_task: Optional[asyncio.Task] = None
+        # Songs added and removed while the analytics are being built, applied once they are ready
+        self._analytics_changes: List[tuple] = []
         self.status = "Listening..."
+        self.indicators: Dict[str, str] = {}
         self.show_help = True
         self._dirty = False
-        self._force_render = False  # For immediate high-priority updates
+        self._force_render = False  # Rebuild the main panel even if no song or selection changed
+        # Set by invalidate() to wake the display loop; created by render_event() on the loop's thread
+        self._render_event: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         self.selected_index = 0
         self.scroll_offset = 0
         self.visible_rows = 15  # Initial value, recalculated on render
         self._status_lock = threading.Lock()
         self._running_tasks: List[asyncio.Task] = []
-        self.max_songs = 500
         
         self._cached_header: Optional[Panel] = None
         self._cached_help: Optional[Panel] = None
+        self._row_cache = RowCache()
         self._last_status = ""
+        self._last_indicators: Dict[str, str] = {}
         self._last_song_count = 0
         self._last_selected = -1
         self._last_scroll = -1
         
+        self.selected_index = max(0, len(self.songs) - 1)
+        self._update_scroll()
+        history.subscribe(self)
         self._setup_layout()
     
     def _calculate_visible_rows(self) -> int:
@@ -78,7 +226,8 @@ class ShazamTUI:
     
     def _make_footer(self) -> Panel:
         """Create footer panel only when status changes"""
-        if self.status == self._last_status and hasattr(self, '_cached_footer'):
+        if (self.status == self._last_status and self.indicators == self._last_indicators
+                and hasattr(self, '_cached_footer')):
             return self._cached_footer
             
         footer_text = Text()
@@ -91,91 +240,68 @@ class ShazamTUI:
         
         footer_text.append(self.status, style="dim")
         
+        for text in self.indicators.values():
+            footer_text.append("  |  ", style="dim")
+            footer_text.append(text, style="cyan")
+        
         self._cached_footer = Panel(
             footer_text,
             style="cyan",
             border_style="cyan"
         )
         self._last_status = self.status
+        self._last_indicators = dict(self.indicators)
         return self._cached_footer
     
-    def _safe_truncate(self, text: str, width: int) -> str:
-        """Safely truncate text with ellipsis, handling unicode properly using Rich's measurement"""
-        if not text:
-            return ""
-        text = str(text)
-        
-        rich_text = Text(text)
-        actual_width = len(rich_text.plain)
-        
-        if actual_width <= width:
-            return text
-        
-        return text[:max(0, width-3)] + "..."
-    
     def _make_songs_panel(self) -> Panel:
-        """Ultra-fast songs panel with optimized selection rendering"""
+        """Songs panel: only the visible window is rendered, from cached rows (see RowCache)"""
         self.visible_rows = self._calculate_visible_rows()
+        songs = self.view
         
-        if not self.songs:
+        if not songs and self.filter_query is not None:
+            content = Align.center(
+                Text(f"No songs match '{self.filter_query}'", style="dim"),
+                vertical="middle"
+            )
+        elif not songs:
             content = Align.center(
                 Text("No songs detected yet...\nListening for music...", style="dim"),
                 vertical="middle"
             )
         else:
-            # Minimal table settings for maximum performance
-            table = Table(show_header=True, header_style="bold cyan", box=None, padding=(0, 1), pad_edge=False)
-            table.add_column("", width=2, no_wrap=True)
-            table.add_column("ID", style="bold green", width=5, no_wrap=True)
-            table.add_column("Time", style="dim", width=10, no_wrap=True)
-            table.add_column("Song", style="bold white", no_wrap=True)
-            table.add_column("Artist", style="magenta", no_wrap=True)
-            table.add_column("Info", style="dim", no_wrap=True)
-            
-            total_songs = len(self.songs)
-            end_idx = min(self.scroll_offset + self.visible_rows, total_songs)
-            visible_songs = self.songs[self.scroll_offset:end_idx]
-            
-            # Pre-calculate selection index for faster comparison
-            selected_offset = self.selected_index - self.scroll_offset
-            
-            # Batch process all rows for faster rendering
-            for idx, song in enumerate(visible_songs):
-                is_selected = (idx == selected_offset)
-                
-                # Use simpler indicator and style
-                indicator = ">" if is_selected else " "
-                row_style = "on blue" if is_selected else ""
-                
-                # Pre-formatted values
-                song_id = f"#{song.get('id', 0):03d}"
-                time = song.get('time', '--:--:--')
-                title = self._safe_truncate(song.get('title', 'Unknown'), 30)
-                artist = self._safe_truncate(song.get('artist', 'Unknown'), 25)
-                genre = self._safe_truncate(song.get('genres', 'Unknown'), 12)
-                year = song.get('release_date', '----')
-                info = f"{genre}, {year}"
-                
-                table.add_row(
-                    indicator,
-                    song_id,
-                    time,
-                    title,
-                    artist,
-                    info,
-                    style=row_style
-                )
-            
-            content = table
+            end_idx = min(self.scroll_offset + self.visible_rows, len(songs))
+            content = SongList(self._row_cache, songs[self.scroll_offset:end_idx], self.selected_index - self.scroll_offset)
         
         title = "[bold cyan]Detected Songs[/]"
-        if len(self.songs) > self.visible_rows:
-            title += f" [dim]({self.scroll_offset + 1}-{min(self.scroll_offset + self.visible_rows, len(self.songs))}/{len(self.songs)})[/]"
+        if self.filter_query is not None:
+            cursor = "_" if self.filter_editing else ""
+            count = f"{len(songs):,}+" if self.filtered is not None and self.filtered.more else f"{len(songs):,}"
+            title += f" [yellow]/{escape(self.filter_query)}{cursor}[/] [dim]({count} matches)[/]"
+            if self._index_task is not None:
+                title += " [dim]searching history...[/]"
+        if self.jump_query is not None:
+            title += f" [yellow]go to #{self.jump_query}_[/]"
+        if len(songs) > self.visible_rows:
+            title += f" [dim]({self.scroll_offset + 1}-{min(self.scroll_offset + self.visible_rows, len(songs))}/{len(songs)})[/]"
         
         return Panel(
             content,
             title=title,
-            subtitle=r"[dim]\[d]ownload | \[y]outube | \[v]oice | \[x]delete | \[q]uit | \[?]help[/]",
+            subtitle=r"[dim]\[d]ownload | \[y]outube | \[v]oice | \[x]delete | \[/]filter | \[s]tats | \[q]uit | \[?]help[/]",
+            border_style="cyan",
+            padding=(1, 2)
+        )
+    
+    def _make_stats_panel(self) -> Panel:
+        if self.analytics is None:
+            stats = Text("Loading stats...", style="dim")
+        else:
+            stats = make_stats_view(self.analytics, period='day', top=5, buckets=7)
+        content = Group(stats, Text(""), make_metrics_view(metrics.snapshot()))
+        return Panel(
+            content,
+            title="[bold cyan]Listening Stats[/]",
+            subtitle=r"[dim]\[s] back to songs[/]",
             border_style="cyan",
             padding=(1, 2)
         )
@@ -186,18 +312,23 @@ class ShazamTUI:
             return self._cached_help
             
         table = Table(show_header=False, box=None, padding=(0, 1), expand=True)
-        table.add_column("Key", style="bold green", width=8)
+        table.add_column("Key", style="bold green", width=10)
         table.add_column("Action", style="white")
         
         commands = [
             ("↑/↓", "Navigate songs"),
+            ("PgUp/PgDn", "Page up / down"),
+            ("Home/End", "First / last song"),
+            ("g", "Go to song #id"),
             ("d", "Download selected"),
             ("y", "Play selected on YT"),
             ("v", "Voice search"),
+            ("/", "Filter songs"),
+            ("s", "Listening stats"),
             ("?", "Toggle help"),
             ("q", "Quit program"),
             ("", ""),
-            ("ESC", "Also quits"),
+            ("ESC", "Clear filter / cancel"),
         ]
         
         for cmd, desc in commands:
@@ -227,7 +358,7 @@ class ShazamTUI:
             if self._cached_header is None:
                 self.layout["header"].update(self._make_header())
             
-            if self.status != self._last_status:
+            if self.status != self._last_status or self.indicators != self._last_indicators:
                 self.layout["footer"].update(self._make_footer())
             
             # Always update songs panel for navigation changes - no caching
@@ -236,7 +367,7 @@ class ShazamTUI:
                 self.selected_index != self._last_selected or 
                 self.scroll_offset != self._last_scroll or
                 self._force_render):
-                self.layout["main"].update(self._make_songs_panel())
+                self.layout["main"].update(self._make_stats_panel() if self.show_stats else self._make_songs_panel())
                 self._last_song_count = len(self.songs)
                 self._last_selected = self.selected_index
                 self._last_scroll = self.scroll_offset
@@ -254,43 +385,181 @@ class ShazamTUI:
                 pass
         return self.layout
     
-    def add_song(self, song_info: Dict[str, Any], auto_scroll: bool = True):
-        """Add a new song to history with automatic memory management"""
-        if 'time' not in song_info:
-            song_info['time'] = datetime.now().strftime("%H:%M:%S")
-        
-        self.songs.append(song_info)
-        
-        if len(self.songs) > self.max_songs:
-            overflow = len(self.songs) - self.max_songs
-            self.songs = self.songs[overflow:]
-            self.selected_index = max(0, self.selected_index - overflow)
-            self.scroll_offset = max(0, self.scroll_offset - overflow)
+    @property
+    def view(self):
+        """The rows being shown: every song, or only the filter's matches."""
+        return self.filtered if self.filtered is not None else self.songs
+    
+    def on_song_added(self, song: SongRecord):
+        """A new detection joined the history window: list it and select it."""
+        if self.analytics is not None:
+            self.analytics.append(song)
+        elif self._analytics_task is not None:
+            self._analytics_changes.append(('added', song))
         
-        if auto_scroll:
+        if self.filter_query is not None:
+            self._apply_filter()
+        else:
             self.selected_index = len(self.songs) - 1
             self._update_scroll()
         
-        self._dirty = True
+        self.invalidate()
     
-    def scroll_up(self):
-        if self.songs and self.selected_index > 0:
+    def on_song_removed(self, song: SongRecord, evicted: bool):
+        """A song was deleted or aged out of the window; the selection stays on the same song where possible."""
+        if evicted:
+            # Still stored and listed, now paged in from the backend like the other older rows
+            self.songs.evict(song.id)
+            return
+        
+        position = self.songs.remove(song.id)
+        if self.analytics is not None:
+            self.analytics.remove(song.id)
+        elif self._analytics_task is not None:
+            self._analytics_changes.append(('removed', song))
+        if self.filtered is not None:
+            position = self.filtered.remove(song.id)
+        
+        if position != -1 and position < self.selected_index:
             self.selected_index -= 1
+            self.scroll_offset = max(0, self.scroll_offset - 1)
+        self.selected_index = max(0, min(self.selected_index, len(self.view) - 1))
+        self._update_scroll()
+        self.invalidate()
+    
+    def start_filter(self):
+        """Enter '/' mode; an existing filter is edited rather than restarted."""
+        if self.filter_query is None:
+            self.filter_query = ""
+            self._apply_filter()
+        if self.history.index is None and self._index_task is None:
+            self._index_task = asyncio.create_task(self._load_index())
+            self.add_task(self._index_task)
+        self.filter_editing = True
+        self.invalidate(force=True)
+    
+    async def _load_index(self):
+        try:
+            await self.history.load_index()
+        finally:
+            self._index_task = None
+        if self.filter_query:
+            self._apply_filter(keep_selection=True)
+        self.invalidate(force=True)
+    
+    def filter_key(self, key: str):
+        """Apply one keystroke of '/' mode: edit the query, accept it or cancel."""
+        if key == 'enter':
+            self.filter_editing = False
+        elif key in ('esc', '\x1b'):
+            self.clear_filter()
+        elif key == 'backspace':
+            self.filter_query = self.filter_query[:-1]
+            self._apply_filter()
+        elif key == 'space':
+            self.filter_query += " "
+            self._apply_filter()
+        elif len(key) == 1 and key.isprintable():
+            self.filter_query += key
+            self._apply_filter()
+        self.invalidate(force=True)
+    
+    def clear_filter(self):
+        selected = self.get_selected_song()
+        self.filter_query = None
+        self.filter_editing = False
+        self.filtered = None
+        
+        # Keep the song that was selected in the filtered view selected in the full list
+        position = self.songs.index(selected.id) if selected else -1
+        self.selected_index = position if position != -1 else max(0, len(self.songs) - 1)
+        self.scroll_offset = max(0, min(self.scroll_offset, self.selected_index))
+        self._update_scroll()
+        self.invalidate(force=True)
+    
+    def _apply_filter(self, keep_selection: bool = False):
+        if not self.filter_query.strip():
+            # Nothing typed yet: every song is a match
+            self.filtered = None
+            if not keep_selection:
+                self.selected_index = max(0, len(self.songs) - 1)
             self._update_scroll()
-            self._dirty = True
-            # Force immediate render flag for responsive navigation
-            self._force_render = True
+            return
+        
+        started = time.perf_counter()
+        self.filtered = SongView(self.history, *self.history.search_newest(self.filter_query, FILTER_MATCH_LIMIT))
+        metrics.record('filter_query_ms', (time.perf_counter() - started) * 1000)
+        
+        if not keep_selection or self.selected_index >= len(self.filtered):
+            self.selected_index = max(0, len(self.filtered) - 1)
+            self.scroll_offset = max(0, len(self.filtered) - self.visible_rows)
+        self._update_scroll()
     
-    def scroll_down(self):
-        if self.songs and self.selected_index < len(self.songs) - 1:
-            self.selected_index += 1
+    def select(self, index: int):
+        """Select row index (clamped to the list). However far it is, this is one offset change and one render."""
+        if not self.view:
+            return
+        index = max(0, min(len(self.view) - 1, index))
+        if index != self.selected_index:
+            self.selected_index = index
             self._update_scroll()
-            self._dirty = True
-            # Force immediate render flag for responsive navigation
-            self._force_render = True
+            self.invalidate(force=True)
+    
+    def scroll_by(self, rows: int):
+        """Move the selection by rows (negative is up), stopping at either end."""
+        self.select(self.selected_index + rows)
+    
+    def scroll_up(self):
+        self.scroll_by(-1)
+    
+    def scroll_down(self):
+        self.scroll_by(1)
+    
+    def page_up(self):
+        self.scroll_by(-self.visible_rows)
+    
+    def page_down(self):
+        self.scroll_by(self.visible_rows)
+    
+    def scroll_home(self):
+        self.select(0)
+    
+    def scroll_end(self):
+        self.select(len(self.view) - 1)
+    
+    def jump_to_id(self, song_id: int) -> bool:
+        """Select the song with this id, leaving the filter if it hides it. False if it isn't stored."""
+        position = self.filtered.index(song_id) if self.filtered is not None else -1
+        if position == -1:
+            position = self.songs.index(song_id)
+            if position == -1:
+                return False
+            if self.filtered is not None:
+                self.clear_filter()
+        self.select(position)
+        return True
+    
+    def start_jump(self):
+        self.jump_query = ""
+        self.invalidate(force=True)
+    
+    def jump_key(self, key: str):
+        """Apply one keystroke of 'g' mode: type the id, jump on Enter, cancel on Esc."""
+        if key == 'enter':
+            query, self.jump_query = self.jump_query, None
+            if query and not self.jump_to_id(int(query)):
+                self.set_status(f"[!] No song #{query} in the history")
+        elif key in ('esc', '\x1b'):
+            self.jump_query = None
+        elif key == 'backspace':
+            self.jump_query = self.jump_query[:-1]
+        elif len(key) == 1 and key in '0123456789':
+            # Not isdigit(): that also accepts characters such as '²' that int() rejects
+            self.jump_query += key
+        self.invalidate(force=True)
     
     def _update_scroll(self):
-        if not self.songs:
+        if not self.view:
             return
         
         if self.selected_index < self.scroll_offset:
@@ -298,37 +567,113 @@ class ShazamTUI:
         
         elif self.selected_index >= self.scroll_offset + self.visible_rows:
             self.scroll_offset = self.selected_index - self.visible_rows + 1
+        
+        # Never scroll past the last full page
+        self.scroll_offset = max(0, min(self.scroll_offset, len(self.view) - self.visible_rows))
     
-    def get_selected_song(self) -> Optional[Dict[str, Any]]:
-        if self.songs and 0 <= self.selected_index < len(self.songs):
-            return self.songs[self.selected_index]
+    def get_selected_song(self) -> Optional[SongRecord]:
+        songs = self.view
+        if songs and 0 <= self.selected_index < len(songs):
+            records = songs[self.selected_index:self.selected_index + 1]
+            return records[0] if records else None
         return None
     
-    def remove_selected_song(self) -> Optional[Dict[str, Any]]:
-        """Remove the currently selected song and return it."""
-        if not self.songs or self.selected_index < 0 or self.selected_index >= len(self.songs):
-            return None
-            
-        removed_song = self.songs.pop(self.selected_index)
-        
-        # Adjust selection if we're at the bottom
-        if self.selected_index >= len(self.songs):
-            self.selected_index = max(0, len(self.songs) - 1)
-            
-        self._dirty = True
-        return removed_song
+    def remove_selected_song(self) -> Optional[SongRecord]:
+        """Delete the selected song from the history and return it; on_song_removed updates the view."""
+        song = self.get_selected_song()
+        if song is not None:
+            self.history.remove(song.id)
+        return song
     
     def set_status(self, status: str):
         """Thread-safe status update"""
         with self._status_lock:
             if self.status != status:
                 self.status = status
-                self._dirty = True
+                self.invalidate()
+    
+    def set_indicator(self, name: str, text: Optional[str]):
+        """Show (or with None, hide) a short named value next to the status, e.g. queue depth"""
+        with self._status_lock:
+            if text is None:
+                if self.indicators.pop(name, None) is not None:
+                    self.invalidate()
+            elif self.indicators.get(name) != text:
+                self.indicators[name] = text
+                self.invalidate()
+    
+    def toggle_stats(self):
+        self.show_stats = not self.show_stats
+        if self.show_stats and self.analytics is None and self._analytics_task is None:
+            self._analytics_task = asyncio.create_task(self._build_analytics())
+            self.add_task(self._analytics_task)
+        self.invalidate(force=True)
+    
+    async def _build_analytics(self, batch_size: int = 1000):
+        """Read the full history a batch at a time between other loop work, then build the columns in a thread."""
+        try:
+            songs = self.history.iter_songs(batch_size)
+            rows = []
+            while True:
+                batch = list(islice(songs, batch_size))
+                rows.extend(batch)
+                if len(batch) < batch_size:
+                    break
+                await asyncio.sleep(0)
+            
+            analytics = await executor_manager.run_in_executor(HistoryAnalytics.from_songs, rows)
+            
+            # Detections made meanwhile: those read above are already in, the rest are appended
+            last_id = (rows[-1].get('id') or 0) if rows else 0
+            for change, song in self._analytics_changes:
+                if change == 'removed':
+                    analytics.remove(song.id)
+                elif (song.id or 0) > last_id:
+                    analytics.append(song)
+            self.analytics = analytics
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log(f"Could not build listening stats: {e}", "ERROR")
+            self.set_status("[!] Could not load stats")
+            self.show_stats = False
+        finally:
+            self._analytics_changes.clear()
+            self._analytics_task = None
+            self.invalidate(force=True)
     
     def toggle_help(self):
         self.show_help = not self.show_help
         self._cached_help = None  # Invalidate cache when toggling
-        self._dirty = True
+        self.invalidate()
+    
+    def invalidate(self, force: bool = False):
+        """Mark the screen stale and wake the display loop. Safe to call from any thread."""
+        if force:
+            self._force_render = True
+        else:
+            self._dirty = True
+        
+        event = self._render_event
+        if event is None or event.is_set():
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            event.set()
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(event.set)
+    
+    def render_event(self) -> asyncio.Event:
+        """The event invalidate() sets; must be called from the running event loop."""
+        if self._render_event is None:
+            self._loop = asyncio.get_running_loop()
+            self._render_event = asyncio.Event()
+            if self.needs_render():
+                self._render_event.set()
+        return self._render_event
     
     def needs_render(self) -> bool:
         return self._dirty or self._force_render
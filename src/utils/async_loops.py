@@ -1,10 +1,26 @@
+import time
 import asyncio
-from typing import Optional
-from ..config import RECORD_SECONDS, AUTO_DOWNLOAD, AUTO_PLAY_YOUTUBE
-from ..core.audio import record_audio
-from ..core.recognizer import recognize_song
+from datetime import datetime
+from typing import Optional, Dict, Any, Tuple
+from ..config import (
+    RECORD_SECONDS, WINDOW_HOP_SECONDS, AUTO_DOWNLOAD, AUTO_PLAY_YOUTUBE, DEBUG_WAV_FILES, MUSIC_GATE,
+    PIPELINE_QUEUE_SIZE, PROGRESSIVE_STEPS, RECOGNITION_DOWNSAMPLE, SAME_SONG_THRESHOLD,
+    BACKLOG_DRAIN_PER_MINUTE
+)
+from ..core.audio import (
+    AudioCapture, SongChangeDetector, analyze_window, fingerprint_similarity, is_music, normalize_audio_data,
+    save_window, to_recognition_format
+)
+from ..core.recognizer import RecognitionDeferred, ShazamRecognizer, shazam_breaker
 from ..services.manager import ServiceManager
 from ..utils.logger import log
+from ..utils.executor import executor_manager
+from ..utils.metrics import metrics
+from ..utils.retry import CircuitBreaker, RateLimiter
+
+
+# Rows each navigation key moves the selection by
+NAVIGATION_STEPS = {'up': -1, 'down': 1}
 
 
 def _handle_background_task(task: asyncio.Task, task_name: str):
@@ -16,81 +32,364 @@ def _handle_background_task(task: asyncio.Task, task_name: str):
         log(f"Background {task_name} failed: {e}", "WARNING")
 
 
-async def audio_recognition_loop(
-    services: ServiceManager,
-    tui: 'ShazamTUI'
-) -> None:
-    iteration = 0
-    consecutive_fails = 0
-    max_fails = 5
+async def _recognize_window(recognizer: ShazamRecognizer, samples, channels: int, rate: int,
+                            detected_at: Optional[str] = None) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """Returns (ok, song_info); ok is False when the window could not even be submitted."""
+    # Temp WAV files are only written when explicitly debugging the file-based path
+    if DEBUG_WAV_FILES:
+        audio_file = await save_window(samples, channels, rate)
+        if not audio_file:
+            return False, None
+        return True, await recognizer.recognize_file(audio_file)
     
-    stop_event = None
+    pcm = await executor_manager.run_in_executor(normalize_audio_data, samples)
+    return True, await recognizer.recognize_pcm(pcm, channels, rate, detected_at)
+
+
+class WindowJob:
+    """A captured first-step window that already passed the music gate and same-song check"""
+    __slots__ = ('start_frame', 'samples', 'channels', 'rate', 'fingerprint', 'locked_song', 'heard_at')
     
-    try:
-        import threading
-        stop_event = threading.Event()
-    except ImportError:
-        pass
+    def __init__(self, start_frame: int, samples, channels: int, rate: int, fingerprint, locked_song: Optional[int]):
+        self.start_frame = start_frame
+        self.samples = samples
+        self.channels = channels
+        self.rate = rate
+        self.fingerprint = fingerprint
+        self.locked_song = locked_song
+        self.heard_at = datetime.now().isoformat()
 
-    while True:
+
+class RecognitionPipeline:
+    """Two-stage recognition: capture keeps slicing windows while a worker matches them.
+    
+    The stages are connected by a bounded queue. When the worker falls behind, the
+    oldest waiting window is dropped, and windows whose audio the worker has already
+    covered are discarded as stale, so lookups always run on the freshest audio.
+    
+    A third stage drains the offline backlog: windows that could not reach Shazam
+    are resubmitted at BACKLOG_DRAIN_PER_MINUTE once the circuit breaker allows it.
+    """
+    
+    MAX_FAILS = 5
+    BACKLOG_POLL_SECONDS = 5.0
+    
+    def __init__(self, services: ServiceManager, tui: 'ShazamTUI'):
+        self.services = services
+        self.tui = tui
+        self.capture = AudioCapture()
+        self.detector = SongChangeDetector()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        self.consecutive_fails = 0
+        self.busy = False
+        # First frame the worker has not yet covered; queued windows starting earlier are stale
+        self.next_start = 0
+        self._last_deferred = None
+        self._drain_rate: Optional[float] = None
+    
+    async def run(self) -> None:
+        if not await self.capture.start():
+            self.tui.set_status("[!] Could not open microphone stream!")
+            return
+        
+        rate = self.capture.rate
+        self.window_frames = int(RECORD_SECONDS * rate)
+        self.overlap_frames = self.window_frames - int(WINDOW_HOP_SECONDS * rate)
+        self.step_frames = [int(step * rate) for step in (PROGRESSIVE_STEPS or [RECORD_SECONDS])]
+        self.next_start = self.capture.frames_written
+        # Capture slices a window every hop of the first step, not every WINDOW_HOP_SECONDS
+        self.detector.set_hop(self._next_hop(0, self.step_frames[0]) / rate)
+        
+        stages = [
+            asyncio.create_task(self._capture_stage()),
+            asyncio.create_task(self._recognize_stage()),
+            asyncio.create_task(self._drain_stage())
+        ]
         try:
-            iteration += 1
-            if stop_event: stop_event.clear()
-            
-            tui.set_status("Listening...")
+            # Either stage returning (e.g. the microphone died) ends the pipeline
+            await asyncio.wait(stages, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for stage in stages:
+                stage.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            self.capture.stop()
+            self.tui.set_indicator('queue', None)
+            self.tui.set_indicator('shazam', None)
+            self.tui.set_indicator('backlog', None)
+    
+    def _next_hop(self, start: int, used_end: int) -> int:
+        # With overlapping windows the next one reaches back, but never by more
+        # than half of the audio just used
+        return max(used_end - self.overlap_frames, start + (used_end - start) // 2)
+    
+    def _show_indicators(self) -> None:
+        self.tui.set_indicator('queue', f"queue {self.queue.qsize()}/{self.queue.maxsize}")
+        state = shazam_breaker.state
+        self.tui.set_indicator('shazam', None if state == CircuitBreaker.CLOSED else f"Shazam {state}")
+        
+        pending = len(self.services.recognizer.backlog)
+        if not pending:
+            self.tui.set_indicator('backlog', None)
+        elif self._drain_rate is None:
+            self.tui.set_indicator('backlog', f"backlog {pending}")
+        else:
+            self.tui.set_indicator('backlog', f"backlog {pending}, draining {self._drain_rate:.1f}/min")
+    
+    def _idle_status(self, status: str) -> None:
+        # While the worker is matching, its status is more useful than the capture side's
+        if not self.busy:
+            self.tui.set_status(status)
+    
+    def _enqueue(self, job: WindowJob) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            metrics.increment('windows_dropped')
+        self.queue.put_nowait(job)
+        self._show_indicators()
+    
+    async def _format(self, samples):
+        channels, rate = self.capture.channels, self.capture.rate
+        if RECOGNITION_DOWNSAMPLE:
+            return await executor_manager.run_in_executor(to_recognition_format, samples, channels, rate)
+        return samples, channels, rate
+    
+    def _is_still_playing(self, fingerprint) -> bool:
+        if not self.detector.is_same_song(fingerprint):
+            return False
+        
+        saved = metrics.increment('lookups_saved')
+        playing = self.services.history.get_by_id(self.detector.song_id)
+        title = playing.title[:30] if playing else "same song"
+        self._idle_status(f"Still playing: {title} ({saved} lookups saved)")
+        return True
+    
+    async def _capture_stage(self) -> None:
+        capture = self.capture
+        first_frames = self.step_frames[0]
+        start = self.next_start
+        read_fails = 0
+        
+        while True:
+            try:
+                # Never slice audio the worker has already covered, and if capture itself
+                # fell so far behind that the window would be overwritten, resync to live audio
+                start = max(start, self.next_start)
+                if start < capture.frames_written - capture.buffer.capacity + self.window_frames:
+                    start = capture.frames_written
+                
+                samples = await capture.read_window(start, start + first_frames)
+                if samples is None:
+                    read_fails += 1
+                    if read_fails >= self.MAX_FAILS:
+                        self.tui.set_status(f"[!] Failed {self.MAX_FAILS} times. Check microphone!")
+                        return
+                    await asyncio.sleep(0.5)
+                    continue
+                read_fails = 0
+                
+                job_start = start
+                start = self._next_hop(job_start, job_start + first_frames)
+                
+                samples, channels, rate = await self._format(samples)
+                features, fingerprint = await executor_manager.run_in_executor(
+                    analyze_window, samples, channels, rate
+                )
+                
+                if MUSIC_GATE and not is_music(features):
+                    self.detector.reset()
+                    metrics.increment('windows_gated')
+                    self._idle_status("No music detected")
+                    continue
+                
+                if self._is_still_playing(fingerprint):
+                    continue
+                
+                self._enqueue(WindowJob(job_start, samples, channels, rate, fingerprint, self.detector.song_id))
             
-            # Pass the stop_event to record_audio
-            audio_file = await record_audio(RECORD_SECONDS, stop_event=stop_event, show_progress=False)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                log(f"Capture error: {e}", "ERROR")
+                self.tui.set_status(f"[!] Capture error: {str(e)[:50]}")
+                await asyncio.sleep(1)
+    
+    async def _recognize_stage(self) -> None:
+        while True:
+            try:
+                job = await self.queue.get()
+                self._show_indicators()
+                
+                if job.start_frame < self.next_start:
+                    metrics.increment('windows_stale')
+                    continue
+                
+                # A song may have been identified after this window was queued
+                if self.detector.song_id is not None and job.locked_song != self.detector.song_id \
+                        and self._is_still_playing(job.fingerprint):
+                    continue
+                
+                self.busy = True
+                try:
+                    submitted = await self._recognize_job(job)
+                finally:
+                    self.busy = False
+                
+                if not submitted:
+                    self.consecutive_fails += 1
+                    if self.consecutive_fails >= self.MAX_FAILS:
+                        self.tui.set_status(f"[!] Failed {self.MAX_FAILS} times. Check microphone!")
+                        return
+                    await asyncio.sleep(0.5)
+                
+                if self.queue.empty():
+                    self._idle_status("Listening...")
             
-            if not audio_file:
-                consecutive_fails += 1
-                if consecutive_fails >= max_fails:
-                    tui.set_status(f"[!] Failed {max_fails} times. Check microphone!")
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                log(f"Recognition error: {e}", "ERROR")
+                self.tui.set_status(f"[!] Recognition error: {str(e)[:50]}")
+                await asyncio.sleep(1)
+    
+    async def _recognize_job(self, job: WindowJob) -> bool:
+        """Match one window, extending it progressively; returns False if nothing could be submitted"""
+        capture, services, tui = self.capture, self.services, self.tui
+        start = job.start_frame
+        submitted = False
+        deferred = False
+        used_end = start + self.step_frames[0]
+        steps = self.step_frames
+        
+        if shazam_breaker.state == CircuitBreaker.OPEN:
+            # Offline: keep one full-length window per song for the backlog rather than
+            # several short ones, since there is no early match to gain
+            if fingerprint_similarity(job.fingerprint, self._last_deferred) >= SAME_SONG_THRESHOLD:
+                metrics.increment('backlog_skipped_same_song')
+                steps = []
+            else:
+                steps = self.step_frames[-1:]
+        
+        song_info = None
+        
+        # Progressive recognition: submit the short window first and only extend it
+        # (from the same continuous audio) while there is no match
+        for frames in steps:
+            if frames == self.step_frames[0]:
+                samples, channels, rate = job.samples, job.channels, job.rate
+            else:
+                samples = await capture.read_window(start, start + frames)
+                if samples is None:
                     break
-                await asyncio.sleep(0.5)
-                continue
-            
-            tui.set_status("Processing...")
+                samples, channels, rate = await self._format(samples)
+            used_end = start + frames
             
-            song_info = await recognize_song(audio_file)
+            tui.set_status(f"Processing {frames / capture.rate:.0f}s ({samples.nbytes // 1024} KB)...")
+            metrics.increment('lookups')
             
+            try:
+                ok, song_info = await _recognize_window(services.recognizer, samples, channels, rate, job.heard_at)
+            except RecognitionDeferred:
+                # Not a failure of ours: keep listening, the drainer submits it later
+                metrics.increment('lookups_deferred')
+                self._last_deferred = job.fingerprint
+                deferred = True
+                break
+            submitted = submitted or ok
             if song_info:
-                is_new, song_id = services.history.add(song_info)
-                consecutive_fails = 0
-                
-                if is_new:
-                    tui.add_song(song_info)
-                    tui.set_status(f"[+] Found: {song_info['title'][:30]}")
-                    
-                    if AUTO_DOWNLOAD:
-                        task = asyncio.create_task(
-                            services.downloader.download_from_jiosaavn(
-                                song_info['title'], song_info['artist']
-                            )
-                        )
-                        task.add_done_callback(lambda t: _handle_background_task(t, "Auto-download"))
-                    
-                    if AUTO_PLAY_YOUTUBE:
-                        task = asyncio.create_task(
-                            services.player.play_song(song_info['title'], song_info['artist'])
+                break
+        
+        self.next_start = max(self.next_start, self._next_hop(start, used_end))
+        self._show_indicators()
+        
+        if deferred or not steps:
+            tui.set_status(f"[!] Shazam unreachable, {len(services.recognizer.backlog)} windows saved for later")
+            return True
+        
+        if not submitted:
+            return False
+        
+        if song_info:
+            # Measured from the first sample of the window, so it includes queueing and the audio wait
+            time_to_match = (capture.frames_written - start) / capture.rate
+            metrics.record('time_to_match', time_to_match)
+            
+            metrics.increment(f"matches_at_{(used_end - start) / capture.rate:.0f}s")
+            
+            is_new, song_id = services.history.add(song_info)
+            self.detector.lock(song_id, job.fingerprint)
+            self.consecutive_fails = 0
+            self._last_deferred = None
+            
+            if is_new:
+                tui.set_status(f"[+] Found: {song_info.title[:30]} in {time_to_match:.1f}s")
+                
+                if AUTO_DOWNLOAD:
+                    task = asyncio.create_task(
+                        services.downloader.download_from_jiosaavn(
+                            song_info.title, song_info.artist
                         )
-                        task.add_done_callback(lambda t: _handle_background_task(t, "Auto-play"))
-            else:
-                consecutive_fails += 1
-                tui.set_status("No match found")
+                    )
+                    task.add_done_callback(lambda t: _handle_background_task(t, "Auto-download"))
+                
+                if AUTO_PLAY_YOUTUBE:
+                    task = asyncio.create_task(
+                        services.player.play_song(song_info.title, song_info.artist)
+                    )
+                    task.add_done_callback(lambda t: _handle_background_task(t, "Auto-play"))
+        else:
+            self.detector.reset()
+            self.consecutive_fails += 1
+            tui.set_status("No match found")
+        
+        return True
+    
+    async def _drain_stage(self) -> None:
+        backlog = self.services.recognizer.backlog
+        limiter = RateLimiter(BACKLOG_DRAIN_PER_MINUTE)
+        drained = 0
+        drain_started = 0.0
+        
+        while True:
+            try:
+                self._show_indicators()
+                entry = backlog.peek()
+                
+                if entry is None or shazam_breaker.state == CircuitBreaker.OPEN:
+                    drained, self._drain_rate = 0, None
+                    await asyncio.sleep(self.BACKLOG_POLL_SECONDS)
+                    continue
+                
+                await limiter.acquire()
+                if not drained:
+                    drain_started = time.monotonic()
+                
+                try:
+                    song_info = await self.services.recognizer.resolve_deferred(entry)
+                except RecognitionDeferred:
+                    continue
+                
+                backlog.pop()
+                drained += 1
+                metrics.increment('backlog_drained')
+                self._drain_rate = drained * 60 / max(time.monotonic() - drain_started, 60 / BACKLOG_DRAIN_PER_MINUTE)
+                
+                if song_info:
+                    is_new, _ = self.services.history.add(song_info, detected_at=entry['detected_at'])
+                    if is_new:
+                        self._idle_status(f"[+] Found from backlog: {song_info.title[:30]}")
             
-        except asyncio.CancelledError:
-            if stop_event:
-                stop_event.set()
-            break
-        except KeyboardInterrupt:
-            if stop_event:
-                stop_event.set()
-            break
-        except Exception as e:
-            log(f"Recognition error: {e}", "ERROR")
-            tui.set_status(f"[!] Recognition error: {str(e)[:50]}")
-            await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                log(f"Backlog drain error: {e}", "ERROR")
+                await asyncio.sleep(self.BACKLOG_POLL_SECONDS)
+
+
+async def audio_recognition_loop(
+    services: ServiceManager,
+    tui: 'ShazamTUI'
+) -> None:
+    await RecognitionPipeline(services, tui).run()
 
 
 async def command_processor_loop(
@@ -102,20 +401,27 @@ async def command_processor_loop(
 ) -> None:
     from ..ui.commands import process_command
     iteration = iteration_counter
+    # A key taken off the queue while folding arrow keys, handled next
+    held = None
     
     while True:
         try:
-            command = await command_queue.get()
+            if held is not None:
+                command, held = held, None
+            else:
+                command = await command_queue.get()
             iteration += 1
             
-            # Handle navigation commands immediately with no delay
-            if command == 'up':
-                tui.scroll_up()
-                # Process next command immediately if available
-                continue
-            elif command == 'down':
-                tui.scroll_down()
-                # Process next command immediately if available
+            # A held arrow key queues a burst of steps: fold the run into one move and one frame
+            rows = NAVIGATION_STEPS.get(command)
+            if rows is not None:
+                while not command_queue.empty():
+                    command = command_queue.get_nowait()
+                    if command not in NAVIGATION_STEPS:
+                        held = command
+                        break
+                    rows += NAVIGATION_STEPS[command]
+                tui.scroll_by(rows)
                 continue
             
             result = await process_command(
@@ -131,7 +437,7 @@ async def command_processor_loop(
             if result == 'quit':
                 recognition_task.cancel()
                 break
-                
+        
         except asyncio.CancelledError:
             break
         except KeyboardInterrupt:
@@ -1,10 +1,15 @@
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from ..utils.logger import log
 
 
 class ExecutorManager:
     _instance = None
     _executor = None
+    _process_executor = None
+    _process_pool_failed = False
     _loop = None
     
     def __new__(cls):
@@ -23,6 +28,23 @@ class ExecutorManager:
         
         return self._executor
     
+    def get_process_executor(self):
+        """CPU-heavy work (signature generation) runs here so it never holds the event loop's GIL."""
+        if self._process_executor is None and not self._process_pool_failed:
+            import os
+            try:
+                # spawn: forking a process that owns audio callback threads is not safe
+                self._process_executor = ProcessPoolExecutor(
+                    max_workers=min(2, os.cpu_count() or 1),
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            except (OSError, NotImplementedError, ImportError) as e:
+                # e.g. Termux has no sem_open; fall back to threads
+                log(f"Process pool unavailable, using threads: {e}", "WARNING")
+                self._process_pool_failed = True
+        
+        return self._process_executor
+    
     def get_loop(self):
         if self._loop is None or self._loop.is_closed():
             self._loop = asyncio.get_event_loop()
@@ -33,9 +55,36 @@ class ExecutorManager:
         executor = self.get_executor()
         return await loop.run_in_executor(executor, func, *args)
     
+    async def run_in_process(self, func, *args):
+        """Run a picklable top-level function in the process pool, or a thread if there is none."""
+        executor = self.get_process_executor()
+        if executor is None:
+            return await self.run_in_executor(func, *args)
+        
+        try:
+            return await self.get_loop().run_in_executor(executor, func, *args)
+        except BrokenProcessPool as e:
+            log(f"Process pool broke, using threads: {e}", "WARNING")
+            self._process_executor = None
+            self._process_pool_failed = True
+            return await self.run_in_executor(func, *args)
+    
+    async def warm_up(self):
+        """Start the worker processes ahead of the first recognition."""
+        executor = self.get_process_executor()
+        if executor is not None:
+            import os
+            try:
+                await self.get_loop().run_in_executor(executor, os.getpid)
+            except Exception as e:
+                log(f"Process pool warm-up failed: {e}", "WARNING")
+    
     def shutdown(self, wait=True):
         if self._executor:
             self._executor.shutdown(wait=wait)
             self._executor = None
+        if self._process_executor:
+            self._process_executor.shutdown(wait=wait, cancel_futures=True)
+            self._process_executor = None
         self._loop = None
 executor_manager = ExecutorManager()
@@ -1,6 +1,6 @@
 import asyncio
 import aiohttp
-from typing import Optional
+from typing import Optional, List
 from ..utils.logger import log
 
 
@@ -13,29 +13,34 @@ class HTTPSessionManager:
             cls._instance = super().__new__(cls)
         return cls._instance
     
+    def create_session(self, limit_per_host: int = 10, trace_configs: Optional[List[aiohttp.TraceConfig]] = None) -> aiohttp.ClientSession:
+        """Build a keep-alive pooled session with the app's standard limits and timeouts."""
+        connector = aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=limit_per_host,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True,
+            force_close=False
+        )
+        
+        timeout = aiohttp.ClientTimeout(
+            total=30,
+            connect=10,
+            sock_read=20
+        )
+        
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers={
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            },
+            trace_configs=trace_configs
+        )
+    
     async def get_session(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
-            connector = aiohttp.TCPConnector(
-                limit=100,
-                limit_per_host=10,
-                ttl_dns_cache=300,
-                enable_cleanup_closed=True,
-                force_close=False
-            )
-            
-            timeout = aiohttp.ClientTimeout(
-                total=30,
-                connect=10,
-                sock_read=20
-            )
-            
-            self._session = aiohttp.ClientSession(
-                connector=connector,
-                timeout=timeout,
-                headers={
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                }
-            )
+            self._session = self.create_session()
             
             log("HTTP session created with connection pooling", "INFO")
         
@@ -0,0 +1,50 @@
+from typing import Dict, Any
+
+
+class Metrics:
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._counters = {}
+            cls._instance._timings = {}
+        return cls._instance
+    
+    def increment(self, name: str, amount: int = 1) -> int:
+        self._counters[name] = self._counters.get(name, 0) + amount
+        return self._counters[name]
+    
+    def count(self, name: str) -> int:
+        return self._counters.get(name, 0)
+    
+    def record(self, name: str, value: float) -> None:
+        """Track last/average/min/max for a timing or size measurement."""
+        stats = self._timings.get(name)
+        if stats is None:
+            self._timings[name] = {'last': value, 'total': value, 'count': 1, 'min': value, 'max': value}
+            return
+        
+        stats['last'] = value
+        stats['total'] += value
+        stats['count'] += 1
+        stats['min'] = min(stats['min'], value)
+        stats['max'] = max(stats['max'], value)
+    
+    def average(self, name: str) -> float:
+        stats = self._timings.get(name)
+        return stats['total'] / stats['count'] if stats else 0.0
+    
+    def last(self, name: str) -> float:
+        stats = self._timings.get(name)
+        return stats['last'] if stats else 0.0
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'counters': dict(self._counters),
+            'timings': {
+                name: {**stats, 'avg': stats['total'] / stats['count']}
+                for name, stats in self._timings.items()
+            }
+        }
+metrics = Metrics()
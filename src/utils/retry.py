@@ -1,29 +1,148 @@
+import time
 import asyncio
 import functools
-from typing import TypeVar, Callable, Any, Type
+from typing import TypeVar, Callable, Any, Type, Optional
 from ..utils.logger import log
+from ..utils.metrics import metrics
 
 
 T = TypeVar('T')
 
 
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit breaker is open."""
+    
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} circuit open, retrying in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class RateLimiter:
+    """Token bucket: allows `burst` calls at once and refills at `per_minute` calls per minute."""
+    
+    def __init__(self, per_minute: float, burst: int = 1):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    async def acquire(self) -> None:
+        # The lock queues waiters so tokens are handed out in arrival order
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                wait = (1 - self.tokens) / self.rate
+                metrics.record('rate_limit_wait_ms', wait * 1000)
+                await asyncio.sleep(wait)
+                self._refill()
+            self.tokens -= 1
+
+
+class CircuitBreaker:
+    """Stops calling a failing service for a while instead of piling retries onto it.
+    
+    closed: calls go through; `failure_threshold` consecutive failures open it.
+    open: calls fail fast with CircuitOpenError for `reset_timeout` seconds.
+    half-open: a single probe call is let through; success closes, failure re-opens.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+    
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at = 0.0
+        self._state = self.CLOSED
+        self._probe_started: Optional[float] = None
+    
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self.retry_in() <= 0:
+            self._state = self.HALF_OPEN
+            self._probe_started = None
+        return self._state
+    
+    def retry_in(self) -> float:
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+    
+    def check(self) -> None:
+        """Raise CircuitOpenError while open, without taking the half-open probe."""
+        if self.state == self.OPEN or self._probe_in_flight():
+            raise CircuitOpenError(self.name, self.retry_in())
+    
+    def _probe_in_flight(self) -> bool:
+        # A probe that never reported back (e.g. cancelled) stops blocking after reset_timeout
+        return (self._state == self.HALF_OPEN and self._probe_started is not None
+                and time.monotonic() - self._probe_started < self.reset_timeout)
+    
+    def before_call(self) -> None:
+        self.check()
+        if self._state == self.HALF_OPEN:
+            self._probe_started = time.monotonic()
+    
+    def record_success(self) -> None:
+        self.failures = 0
+        self._state = self.CLOSED
+        self._probe_started = None
+    
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                metrics.increment(f"{self.name}_circuit_opened")
+                log(f"{self.name} circuit opened after {self.failures} failures", "WARNING")
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_started = None
+
+
 def async_retry(
     max_attempts: int = 3,
     base_delay: float = 1.0,
     max_delay: float = 30.0,
     exponential_base: float = 2.0,
-    exceptions: tuple[Type[Exception], ...] = (Exception,)
+    exceptions: tuple[Type[Exception], ...] = (Exception,),
+    rate_limiter: Optional[RateLimiter] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None
 ):
+    """Retry with exponential backoff.
+    
+    Every attempt, including retries, waits for `rate_limiter` and is counted by
+    `circuit_breaker`; once the breaker opens, retrying stops with CircuitOpenError.
+    """
     def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
         @functools.wraps(func)
         async def wrapper(*args, **kwargs) -> Any:
             last_exception = None
             
             for attempt in range(1, max_attempts + 1):
+                if circuit_breaker:
+                    circuit_breaker.before_call()
+                if rate_limiter:
+                    await rate_limiter.acquire()
+                
                 try:
-                    return await func(*args, **kwargs)
+                    result = await func(*args, **kwargs)
+                    if circuit_breaker:
+                        circuit_breaker.record_success()
+                    return result
                 except exceptions as e:
                     last_exception = e
+                    if circuit_breaker:
+                        circuit_breaker.record_failure()
+                        if circuit_breaker.state == CircuitBreaker.OPEN:
+                            raise CircuitOpenError(circuit_breaker.name, circuit_breaker.retry_in()) from e
                     
                     if attempt == max_attempts:
                         log(f"❌ {func.__name__} failed after {max_attempts} attempts: {e}", "ERROR")
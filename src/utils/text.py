@@ -0,0 +1,66 @@
+import re
+import unicodedata
+from typing import Set, Tuple
+
+
+_NON_WORD = re.compile(r"[\W_]+")
+_APOSTROPHES = re.compile(r"['\u2019\u02bc]")
+
+# "Song (feat. X)", "Song [ft. X]" or a trailing "Song feat. X"
+_FEATURED_IN_TITLE = re.compile(
+    r"\s*[\(\[]\s*(?:feat\.?|ft\.?|featuring|with)\s+([^\)\]]*)[\)\]]|\s+(?:feat\.?|ft\.?|featuring)\s+(.+)$",
+    re.IGNORECASE
+)
+# Word separators only count between spaces, so "Malcolm X" stays one name
+_ARTIST_SEPARATOR = re.compile(
+    r"\s*(?:[,&+/;]|(?<=\s)(?:x|and|with|vs\.?|feat\.?|ft\.?|featuring)(?=\s))\s*",
+    re.IGNORECASE
+)
+_VERSION_WORDS = (
+    r"remaster(?:ed)?|re-?mix(?:ed)?|mix|edit|version|live|acoustic|unplugged|mono|stereo|radio|"
+    r"extended|instrumental|demo|deluxe|explicit|clean|single|bonus|re-?recorded|anniversary"
+)
+# A trailing "(... Remix)" / "[Live]" group or " - 2011 Remaster" part naming a version
+_VERSION_SUFFIX = re.compile(
+    rf"\s*(?:[\(\[][^\(\)\[\]]*\b(?:{_VERSION_WORDS})\b[^\(\)\[\]]*[\)\]]|\s-\s[^-]*\b(?:{_VERSION_WORDS})\b[^-]*)$",
+    re.IGNORECASE
+)
+
+
+def normalize_text(text: str) -> str:
+    """Casefolded, accent-free form of text with punctuation collapsed to single spaces.
+    
+    "Beyoncé - Halo (Live)" becomes "beyonce halo live", so search and
+    comparisons ignore case, diacritics and punctuation. Apostrophes are
+    dropped rather than spaced, so "Don't" and "Dont" agree.
+    """
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize('NFKD', _APOSTROPHES.sub('', text.casefold()))
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_WORD.sub(' ', stripped).strip()
+
+
+def split_featured(title: str) -> Tuple[str, str]:
+    """Separate featured artists from a title: ("Song (feat. X)") -> ("Song", "X")."""
+    featured = []
+    
+    def _collect(match):
+        featured.append(match.group(1) or match.group(2))
+        return ''
+    
+    return _FEATURED_IN_TITLE.sub(_collect, title).strip(), ', '.join(featured)
+
+
+def split_artists(artist: str) -> Set[str]:
+    """Normalized names in an artist credit; "A feat. B", "A & B" and "B, A" give the same set."""
+    return {name for name in (normalize_text(part) for part in _ARTIST_SEPARATOR.split(artist)) if name}
+
+
+def strip_version_suffix(title: str) -> str:
+    """Drop trailing version markers: "Song - 2011 Remaster (Live)" -> "Song"."""
+    while True:
+        stripped = _VERSION_SUFFIX.sub('', title)
+        if stripped == title or not stripped.strip():
+            return title
+        title = stripped